@@ -1,10 +1,14 @@
 from fastapi_mail.config import ConnectionConfig
 from fastapi_mail.fastmail import FastMail
+from fastapi_mail.retry import RetryPolicy
 from fastapi_mail.schemas import (
     MessageSchema,
     MessageType,
     MultipartSubtypeEnum,
     NameEmail,
+    Personalization,
+    RenderMode,
+    SendResult,
 )
 
 from . import email_utils
@@ -14,9 +18,13 @@ __author__ = "sabuhi.shukurov@gmail.com"
 __all__ = [
     "FastMail",
     "ConnectionConfig",
+    "RetryPolicy",
     "MessageSchema",
     "email_utils",
     "MultipartSubtypeEnum",
     "MessageType",
     "NameEmail",
+    "Personalization",
+    "RenderMode",
+    "SendResult",
 ]
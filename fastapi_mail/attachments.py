@@ -0,0 +1,377 @@
+import asyncio
+import base64
+import hashlib
+import io
+import mmap
+import os
+import re
+import tempfile
+import uuid
+from collections import OrderedDict
+from email.message import Message
+from email.mime.base import MIMEBase
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Union
+from weakref import WeakKeyDictionary
+
+from aiosmtplib.protocol import PERIOD_REGEX, normalize_message_line_endings
+from starlette.datastructures import Headers, UploadFile
+
+if TYPE_CHECKING:
+    from fastapi_mail.config import ConnectionConfig
+
+
+class FileAttachment(UploadFile):
+    """
+    Attachment given as a file path, read only when its MIME part is built
+
+    Reads run in a worker thread so they do not block the event loop. Files
+    of at least ``MMAP_THRESHOLD`` bytes are memory mapped instead of copied,
+    the encoder reads them straight from the page cache. ``read`` and ``seek``
+    keep a position like an UploadFile, but ``file`` is ``None``: the file is
+    only open while it is read.
+
+    :param: path: Path of the file
+    :param: filename: Name the recipient sees, the base name of the path by default
+    :param: headers: Headers of the file, its guessed content type
+    """
+
+    MMAP_THRESHOLD = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        filename: Optional[str] = None,
+        headers: Optional[Headers] = None,
+    ) -> None:
+        self.path = os.fspath(path)
+        self._position = 0
+        super().__init__(
+            file=None,  # type: ignore
+            filename=filename or os.path.basename(self.path),
+            headers=headers,
+        )
+
+    async def fingerprint(self) -> str:
+        """
+        Hex digest identifying the file by its path, size and modification time
+
+        Lets encoded parts be reused without reading the file again. A file
+        rewritten in place with the same size and modification time has the
+        same fingerprint, so these keys never reach the disk tier of the cache.
+        """
+        stat = await asyncio.to_thread(os.stat, self.path)
+        self.size = stat.st_size
+        key = f"{self.path}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        return hashlib.sha256(key.encode("utf-8", "surrogateescape")).hexdigest()
+
+    def _read(self) -> Union[bytes, mmap.mmap]:
+        with open(self.path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size >= self.MMAP_THRESHOLD:
+                # The mapping outlives the file descriptor and is unmapped
+                # once the encoder drops it
+                return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            return file.read()
+
+    async def content(self) -> Union[bytes, mmap.mmap]:
+        """
+        Returns the whole file, a read only mmap for large files
+        """
+        return await asyncio.to_thread(self._read)
+
+    def _read_at(self, offset: int, size: int) -> bytes:
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            return file.read(size)
+
+    async def read(self, size: int = -1) -> bytes:
+        """
+        Reads up to ``size`` bytes from the current position, the rest of the
+        file by default
+        """
+        data = await asyncio.to_thread(self._read_at, self._position, size)
+        self._position += len(data)
+        return data
+
+    async def chunks(self, size: int) -> AsyncIterator[bytes]:
+        """
+        Yields the content of the file ``size`` bytes at a time
+        """
+        file = await asyncio.to_thread(open, self.path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(file.read, size):
+                yield chunk
+        finally:
+            file.close()
+
+    async def seek(self, offset: int) -> None:
+        self._position = offset
+
+    async def close(self) -> None:
+        # The file is only open while it is read
+        self._position = 0
+
+    async def write(self, data: bytes) -> None:
+        raise io.UnsupportedOperation("File path attachments are read only")
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(path={self.path!r}, filename={self.filename!r})"
+        )
+
+
+class AttachmentCache:
+    """
+    Base64 encoded attachment payloads keyed by the hash of their content
+
+    Payloads are kept in memory up to ``max_size`` characters, evicting the
+    least recently used. With a ``directory`` they are also written to disk,
+    where evicted payloads and those of earlier processes are found again;
+    the disk tier is trimmed to ``directory_max_size`` bytes, oldest first.
+    Keys that do not hash the content, such as the fingerprint of a path
+    attachment, are kept in memory only with ``disk=False``.
+
+    :param: max_size: Characters of encoded payload kept in memory
+    :param: directory: Directory of the on-disk tier, ``None`` for memory only
+    :param: directory_max_size: Bytes kept on disk, ``None`` for no limit
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        directory: Optional[Union[str, Path]] = None,
+        directory_max_size: Optional[int] = None,
+    ) -> None:
+        self.max_size = max_size
+        self.directory = Path(directory) if directory else None
+        self.directory_max_size = directory_max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._payloads: "OrderedDict[str, str]" = OrderedDict()
+
+    @classmethod
+    def from_config(cls, config: "ConnectionConfig") -> Optional["AttachmentCache"]:
+        if not config.ATTACHMENT_CACHE_SIZE:
+            return None
+        return cls(
+            config.ATTACHMENT_CACHE_SIZE,
+            config.ATTACHMENT_CACHE_DIR,
+            config.ATTACHMENT_CACHE_DIR_SIZE,
+        )
+
+    def _path(self, digest: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{digest}.b64"
+
+    def _remember(self, digest: str, payload: str) -> None:
+        if len(payload) > self.max_size:
+            return
+        self._payloads[digest] = payload
+        self.size += len(payload)
+        while self.size > self.max_size:
+            _, evicted = self._payloads.popitem(last=False)
+            self.size -= len(evicted)
+
+    def _read(self, digest: str) -> Optional[str]:
+        path = self._path(digest)
+        try:
+            payload = path.read_text("ascii")
+        except FileNotFoundError:
+            return None
+        # Reads count as use, so trimming removes what was not needed lately
+        os.utime(path)
+        return payload
+
+    def _write(self, digest: str, payload: str) -> None:
+        assert self.directory is not None
+        # Written under a temporary name, a crash never leaves half a payload
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="ascii") as file:
+            file.write(payload)
+        os.replace(temporary, self._path(digest))
+        if self.directory_max_size is not None:
+            self._trim()
+
+    def _trim(self) -> None:
+        assert self.directory is not None and self.directory_max_size is not None
+        files = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(".b64")
+        )
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in files:
+            if size <= self.directory_max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+    async def get(self, digest: str, disk: bool = True) -> Optional[str]:
+        """
+        Returns the encoded payload of the content with the given hex digest
+
+        :param: disk: Also look in the disk tier
+        """
+        payload = self._payloads.get(digest)
+        if payload is not None:
+            self._payloads.move_to_end(digest)
+        elif disk and self.directory is not None:
+            payload = await asyncio.to_thread(self._read, digest)
+            if payload is not None:
+                self._remember(digest, payload)
+
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return payload
+
+    async def put(self, digest: str, payload: str, disk: bool = True) -> None:
+        if digest in self._payloads:
+            return
+        self._remember(digest, payload)
+        if disk and self.directory is not None:
+            await asyncio.to_thread(self._write, digest, payload)
+
+    def status(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._payloads),
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def encoded_size(size: int) -> int:
+    """
+    Bytes ``size`` bytes take once base64 encoded in lines of 76 characters
+    """
+    characters = (size + 2) // 3 * 4
+    lines = (characters + 75) // 76
+    return characters + 2 * lines
+
+
+class StreamedPart(MIMEBase):
+    """
+    Attachment part whose content is base64 encoded while it is sent
+
+    The payload is a placeholder token, ``MessageStream`` swaps it for the
+    encoded file when the serialized message is written to DATA.
+
+    :param: maintype: Main MIME type of the attachment
+    :param: subtype: MIME subtype of the attachment
+    :param: file: UploadFile or FileAttachment the content is read from
+    :param: size: Size of the file in bytes
+    """
+
+    def __init__(self, maintype: str, subtype: str, file: Any, size: int) -> None:
+        super().__init__(maintype, subtype)
+        self.file = file
+        self.size = size
+        self.token = f"fastapi-mail-stream-{uuid.uuid4().hex}"
+        self.set_payload(self.token + "\n")
+        self["Content-Transfer-Encoding"] = "base64"
+
+
+class MessageStream:
+    """
+    Serialized message with the content of streamed parts read on demand
+
+    Iterating yields DATA ready chunks: CRLF line endings and leading dots
+    doubled, without the final ``.`` line. Streamed files are read and
+    encoded ``CHUNK_SIZE`` bytes at a time, so memory does not grow with
+    their size. The stream can be iterated again to retry a send.
+
+    :param: segments: Serialized bytes and the StreamedParts between them
+    """
+
+    # A multiple of 57 bytes, so every chunk encodes to whole 76 character lines
+    CHUNK_SIZE = 57 * 1024
+
+    def __init__(self, segments: List[Union[bytes, StreamedPart]]) -> None:
+        self.segments = [
+            (
+                PERIOD_REGEX.sub(b"..", normalize_message_line_endings(segment))
+                if isinstance(segment, bytes)
+                else segment
+            )
+            for segment in segments
+        ]
+
+    @classmethod
+    def split(cls, data: bytes, message: Message) -> Optional["MessageStream"]:
+        """
+        Cuts the serialized ``message`` at its streamed parts, ``None`` if it has none
+        """
+        parts = {
+            part.token.encode("ascii"): part
+            for part in message.walk()
+            if isinstance(part, StreamedPart)
+        }
+        if not parts:
+            return None
+        tokens = b"|".join(re.escape(token) for token in parts)
+        pieces = re.split(b"(" + tokens + b")\r?\n", data)
+        return cls(
+            [parts[piece] if index % 2 else piece for index, piece in enumerate(pieces)]
+        )
+
+    @property
+    def size(self) -> int:
+        """
+        Bytes the message takes in DATA, as announced with the SIZE extension
+        """
+        return sum(
+            len(segment) if isinstance(segment, bytes) else encoded_size(segment.size)
+            for segment in self.segments
+        )
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for segment in self.segments:
+            if isinstance(segment, bytes):
+                yield segment
+                continue
+            file = segment.file
+            if isinstance(file, FileAttachment):
+                chunks = file.chunks(self.CHUNK_SIZE)
+            else:
+                chunks = _upload_chunks(file, self.CHUNK_SIZE)
+            rest = b""
+            async for chunk in chunks:
+                # Short reads are carried over so lines stay 76 characters long
+                chunk = rest + chunk
+                cut = len(chunk) - len(chunk) % 57
+                chunk, rest = chunk[:cut], chunk[cut:]
+                if chunk:
+                    yield _encode(chunk)
+            if rest:
+                yield _encode(rest)
+
+
+def _encode(chunk: bytes) -> bytes:
+    # base64 has no dots, only the line endings need converting
+    return base64.encodebytes(chunk).replace(b"\n", b"\r\n")
+
+
+# One lock per upload, held for each seek and read of a chunk
+_upload_locks: "WeakKeyDictionary[UploadFile, asyncio.Lock]" = WeakKeyDictionary()
+
+
+async def _upload_chunks(file: UploadFile, size: int) -> AsyncIterator[bytes]:
+    # Messages of a batch share the part and may be sent at the same time,
+    # every stream keeps its own position in the file
+    lock = _upload_locks.setdefault(file, asyncio.Lock())
+    offset = 0
+    while True:
+        async with lock:
+            await file.seek(offset)
+            chunk = await file.read(size)
+        if not chunk:
+            return
+        offset += len(chunk)
+        yield chunk
@@ -0,0 +1,92 @@
+import time
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from fastapi_mail.config import ConnectionConfig
+from fastapi_mail.errors import CircuitBreakerOpen
+
+
+class CircuitState(Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Fails connection attempts fast while a relay is down
+
+    After ``threshold`` connect or login failures in a row the circuit opens
+    and new connections are refused with ``CircuitBreakerOpen`` instead of
+    waiting out ``TIMEOUT``. Once ``cooldown`` seconds have passed a single
+    probe connection is let through: success closes the circuit, failure
+    opens it for another cooldown.
+
+    :param: threshold: Consecutive failures that open the circuit
+    :param: cooldown: Seconds the circuit stays open before a probe
+    """
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @classmethod
+    def from_config(cls, config: ConnectionConfig) -> Optional["CircuitBreaker"]:
+        if config.CIRCUIT_BREAKER_THRESHOLD is None:
+            return None
+        return cls(config.CIRCUIT_BREAKER_THRESHOLD, config.CIRCUIT_BREAKER_COOLDOWN)
+
+    @property
+    def state(self) -> CircuitState:
+        if self._opened_at is None:
+            return CircuitState.closed
+        if self._probing or time.monotonic() - self._opened_at >= self.cooldown:
+            return CircuitState.half_open
+        return CircuitState.open
+
+    def before_connect(self) -> None:
+        """
+        Raises ``CircuitBreakerOpen`` unless a connection may be attempted
+        """
+        state = self.state
+        if state == CircuitState.closed:
+            return
+        if state == CircuitState.half_open and not self._probing:
+            self._probing = True
+            return
+        self.rejected += 1
+        raise CircuitBreakerOpen(
+            f"Circuit breaker is open after {self.failures} connection failures"
+        )
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.threshold:
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def abort(self) -> None:
+        """
+        Gives the probe slot back when an attempt was cancelled
+        """
+        self._probing = False
+
+    def status(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == CircuitState.open and self._opened_at is not None:
+            retry_in = self._opened_at + self.cooldown - time.monotonic()
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "retry_in": retry_in,
+        }
@@ -1,10 +1,13 @@
+from pathlib import Path
 from typing import Optional
 
 from aiosmtplib.api import DEFAULT_TIMEOUT
-from jinja2 import Environment, FileSystemLoader
-from pydantic import DirectoryPath, EmailStr, SecretStr, conint
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from pydantic import DirectoryPath, EmailStr, PrivateAttr, SecretStr, confloat, conint
 from pydantic_settings import BaseSettings as Settings
 
+from fastapi_mail.schemas import RenderMode
+
 
 class ConnectionConfig(Settings):
     MAIL_USERNAME: str
@@ -16,22 +19,69 @@ class ConnectionConfig(Settings):
     MAIL_DEBUG: conint(gt=-1, lt=2) = 0  # type: ignore
     MAIL_FROM: EmailStr
     MAIL_FROM_NAME: Optional[str] = None
+    MAIL_MSGID_DOMAIN: Optional[str] = None
     TEMPLATE_FOLDER: Optional[DirectoryPath] = None
+    TEMPLATE_CACHE_SIZE: conint(ge=0) = 400  # type: ignore
+    TEMPLATE_AUTO_RELOAD: bool = True
+    TEMPLATE_BYTECODE_CACHE_DIR: Optional[DirectoryPath] = None
+    TEMPLATE_RENDER_MODE: RenderMode = RenderMode.sync
+    TEMPLATE_RENDER_WORKERS: Optional[conint(gt=0)] = None  # type: ignore
     SUPPRESS_SEND: conint(gt=-1, lt=2) = 0  # type: ignore
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
     TIMEOUT: int = DEFAULT_TIMEOUT
     LOCAL_HOSTNAME: Optional[str] = None
     CERT_BUNDLE: Optional[str] = None
+    SEND_CONCURRENCY: conint(gt=0) = 1  # type: ignore
+    SEND_PIPELINE_WINDOW: Optional[conint(gt=0)] = None  # type: ignore
+    MAX_RECIPIENTS_PER_ENVELOPE: Optional[conint(gt=0)] = None  # type: ignore
+    USE_MIME_PROTOTYPES: bool = False
+    ATTACHMENT_CACHE_SIZE: Optional[conint(gt=0)] = None  # type: ignore
+    ATTACHMENT_CACHE_DIR: Optional[DirectoryPath] = None
+    ATTACHMENT_CACHE_DIR_SIZE: Optional[conint(gt=0)] = None  # type: ignore
+    ATTACHMENT_STREAM_THRESHOLD: Optional[conint(gt=0)] = None  # type: ignore
+    QUEUE_MAX_SIZE: conint(gt=0) = 1000  # type: ignore
+    QUEUE_WORKERS: conint(gt=0) = 4  # type: ignore
+    SPOOL_PATH: Optional[Path] = None
+    SPOOL_COMMIT_INTERVAL: confloat(ge=0) = 0.005  # type: ignore
+    USE_CONNECTION_POOL: bool = False
+    POOL_MIN_SIZE: conint(ge=0) = 0  # type: ignore
+    POOL_MAX_SIZE: conint(gt=0) = 10  # type: ignore
+    POOL_IDLE_TIMEOUT: confloat(ge=0) = 60  # type: ignore
+    POOL_MAX_MESSAGES_PER_CONNECTION: Optional[conint(gt=0)] = 100  # type: ignore
+    RATE_LIMIT_MESSAGES_PER_SECOND: Optional[confloat(gt=0)] = None  # type: ignore
+    RATE_LIMIT_MESSAGES_BURST: Optional[confloat(gt=0)] = None  # type: ignore
+    RATE_LIMIT_RECIPIENTS_PER_MINUTE: Optional[confloat(gt=0)] = None  # type: ignore
+    RATE_LIMIT_RECIPIENTS_BURST: Optional[confloat(gt=0)] = None  # type: ignore
+    CIRCUIT_BREAKER_THRESHOLD: Optional[conint(gt=0)] = None  # type: ignore
+    CIRCUIT_BREAKER_COOLDOWN: confloat(gt=0) = 30  # type: ignore
+
+    _template_env: Optional[Environment] = PrivateAttr(default=None)
+    _template_env_folder: Optional[Path] = PrivateAttr(default=None)
 
     def template_engine(self) -> Environment:
         """
         Return template environment
+
+        The environment is built once and reused, so compiled templates stay
+        in its cache between calls.
         """
         folder = self.TEMPLATE_FOLDER
         if not folder:
             raise ValueError(
                 "Class initialization did not include a ``TEMPLATE_FOLDER`` ``PathLike`` object."
             )
-        template_env = Environment(loader=FileSystemLoader(folder))
-        return template_env
+        if self._template_env is None or self._template_env_folder != folder:
+            self._template_env = Environment(
+                loader=FileSystemLoader(folder),
+                cache_size=self.TEMPLATE_CACHE_SIZE,
+                auto_reload=self.TEMPLATE_AUTO_RELOAD,
+                bytecode_cache=(
+                    FileSystemBytecodeCache(str(self.TEMPLATE_BYTECODE_CACHE_DIR))
+                    if self.TEMPLATE_BYTECODE_CACHE_DIR
+                    else None
+                ),
+                enable_async=self.TEMPLATE_RENDER_MODE == RenderMode.jinja_async,
+            )
+            self._template_env_folder = folder
+        return self._template_env
@@ -1,20 +1,47 @@
+import asyncio
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
 import aiosmtplib
+from aiosmtplib import SMTPResponse, SMTPStatus
+from aiosmtplib.email import parse_address, quote_address
+from aiosmtplib.protocol import PERIOD_REGEX, normalize_message_line_endings
 
+from fastapi_mail.attachments import MessageStream
+from fastapi_mail.breaker import CircuitBreaker
 from fastapi_mail.config import ConnectionConfig
-from fastapi_mail.errors import ConnectionErrors, PydanticClassRequired
+from fastapi_mail.errors import (
+    ConnectionErrors,
+    MessageTooLarge,
+    PydanticClassRequired,
+)
+from fastapi_mail.msg import message_size
+
+if TYPE_CHECKING:
+    from fastapi_mail.relay import Relay
 
 
 class Connection:
     """
     Manages Connection to provided email service with its credentials
+
+    :param: settings: ConnectionConfig of the email service
+    :param: breaker: CircuitBreaker shared by connections to the same service
     """
 
-    def __init__(self, settings: ConnectionConfig) -> None:
+    def __init__(
+        self, settings: ConnectionConfig, breaker: Optional[CircuitBreaker] = None
+    ) -> None:
         if not isinstance(settings, ConnectionConfig):
             raise PydanticClassRequired(
                 "Configuration should be provided from ConnectionConfig class"
             )
         self.settings = settings
+        self.breaker = breaker
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+        self.relay: Optional["Relay"] = None
 
     async def __aenter__(self) -> "Connection":
         """
@@ -27,10 +54,11 @@ class Connection:
         """
         Closing the connection
         """
-        if not self.settings.SUPPRESS_SEND:  # for test environ
-            await self.session.quit()
+        await self.close()
 
     async def _configure_connection(self) -> None:
+        if self.breaker is not None:
+            self.breaker.before_connect()
         try:
             self.session = aiosmtplib.SMTP(
                 hostname=self.settings.MAIL_SERVER,
@@ -53,6 +81,461 @@ class Connection:
                     )
 
         except Exception as error:
+            if self.breaker is not None:
+                self.breaker.record_failure()
             raise ConnectionErrors(
                 f"Exception raised {error}, check your credentials or email service configuration"
+            ) from error
+        except BaseException:
+            if self.breaker is not None:
+                self.breaker.abort()
+            raise
+
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    async def close(self) -> None:
+        """
+        Quits the SMTP session, dropping the transport if the server is gone
+        """
+        if not self.session.is_connected:  # for test environ
+            return
+        try:
+            await self.session.quit()
+        except aiosmtplib.SMTPException:
+            self.session.close()
+
+    async def is_healthy(self) -> bool:
+        """
+        Checks that a reused session still answers, resetting any leftover envelope
+        """
+        if self.settings.SUPPRESS_SEND:  # for test environ
+            return True
+        if not self.session.is_connected:
+            return False
+        try:
+            response = await self.session.rset()
+        except aiosmtplib.SMTPException:
+            return False
+        return response.code == SMTPStatus.completed
+
+    async def sendmail(
+        self,
+        sender: str,
+        recipients: Sequence[str],
+        data: Union[bytes, MessageStream],
+    ) -> Tuple[Dict[str, SMTPResponse], str]:
+        """
+        Sends an already serialized message to the given envelope
+        """
+        if self.session.is_ehlo_or_helo_needed:
+            await self.session.ehlo()
+
+        limit = self.max_message_size
+        if limit is not None and (size := message_size(data)) > limit:
+            raise MessageTooLarge(size, limit)
+
+        mail_options = self._mail_options(sender, recipients)
+        if self.session.supports_extension("pipelining"):
+            return await self._pipelined_sendmail(
+                sender, recipients, data, mail_options
+            )
+        if isinstance(data, MessageStream):
+            return await self._streamed_sendmail(sender, recipients, data, mail_options)
+        return await self.session.sendmail(
+            sender, recipients, data, mail_options=mail_options
+        )
+
+    @property
+    def max_message_size(self) -> Optional[int]:
+        """
+        SIZE limit the server advertised in EHLO, ``None`` when it set none
+        """
+        if not self.session.supports_extension("size"):
+            return None
+        try:
+            limit = int(self.session.esmtp_extensions["size"])
+        except (KeyError, ValueError):
+            return None
+        # RFC 1870: a limit of 0 means there is none
+        return limit or None
+
+    def _mail_options(self, sender: str, recipients: Sequence[str]) -> List[str]:
+        mail_options: List[str] = []
+        try:
+            (sender + "".join(recipients)).encode("ascii")
+        except UnicodeEncodeError:
+            mail_options.append("SMTPUTF8")
+        if self.session.supports_extension("8BITMIME"):
+            mail_options.append("BODY=8BITMIME")
+        return mail_options
+
+    async def _pipelined_sendmail(
+        self,
+        sender: str,
+        recipients: Sequence[str],
+        data: Union[bytes, MessageStream],
+        mail_options: List[str],
+    ) -> Tuple[Dict[str, SMTPResponse], str]:
+        """
+        RFC 2920 transaction: MAIL, every RCPT and DATA go out in one write
+        and their replies are read back together
+        """
+        if "SMTPUTF8" in mail_options and not self.session.supports_extension(
+            "smtputf8"
+        ):
+            raise aiosmtplib.SMTPNotSupported(
+                "SMTPUTF8 is not supported by this server"
+            )
+        encoding = "utf-8" if "SMTPUTF8" in mail_options else "ascii"
+
+        parse_address(sender)
+        for recipient in recipients:
+            parse_address(recipient)
+
+        if isinstance(data, bytes):
+            data = normalize_message_line_endings(data)
+        if self.session.supports_extension("size"):
+            size = len(data) if isinstance(data, bytes) else data.size
+            mail_options = [f"size={size}", *mail_options]
+
+        commands = [
+            b" ".join(
+                [
+                    b"MAIL FROM:" + quote_address(sender).encode(encoding),
+                    *(option.encode("ascii") for option in mail_options),
+                ]
+            )
+        ]
+        commands.extend(
+            b"RCPT TO:" + quote_address(recipient).encode(encoding)
+            for recipient in recipients
+        )
+        commands.append(b"DATA")
+
+        protocol = self.session.protocol
+        if protocol is None:
+            raise aiosmtplib.SMTPServerDisconnected("Server not connected")
+        timeout = self.settings.TIMEOUT
+        try:
+            with _PipelinedReplies(protocol) as replies:
+                protocol.write(b"".join(command + b"\r\n" for command in commands))
+
+                mail_reply = await replies.read(timeout)
+                recipient_errors: Dict[str, SMTPResponse] = {}
+                for recipient in recipients:
+                    reply = await replies.read(timeout)
+                    if reply.code not in (
+                        SMTPStatus.completed,
+                        SMTPStatus.will_forward,
+                    ):
+                        recipient_errors[recipient] = reply
+                data_reply = await replies.read(timeout)
+
+                accepted = len(recipient_errors) < len(recipients)
+                response: Optional[SMTPResponse] = None
+                if data_reply.code == SMTPStatus.start_input:
+                    if mail_reply.code == SMTPStatus.completed and accepted:
+                        await self._write_data(protocol, data)
+                        response = await replies.read(timeout)
+                    else:
+                        # The server took DATA despite refusing the envelope,
+                        # end it with an empty body that has nowhere to go
+                        protocol.write(b".\r\n")
+                        await replies.read(timeout)
+        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError):
+            # Unread replies would be paired with the wrong commands later on
+            self.session.close()
+            raise
+
+        if mail_reply.code != SMTPStatus.completed:
+            await self._reset()
+            raise aiosmtplib.SMTPSenderRefused(
+                mail_reply.code, mail_reply.message, sender
+            )
+        if not accepted:
+            await self._reset()
+            raise aiosmtplib.SMTPRecipientsRefused(
+                [
+                    aiosmtplib.SMTPRecipientRefused(reply.code, reply.message, address)
+                    for address, reply in recipient_errors.items()
+                ]
+            )
+        if response is None:
+            await self._reset()
+            raise aiosmtplib.SMTPDataError(data_reply.code, data_reply.message)
+        if response.code != SMTPStatus.completed:
+            raise aiosmtplib.SMTPDataError(response.code, response.message)
+
+        return recipient_errors, response.message
+
+    async def _streamed_sendmail(
+        self,
+        sender: str,
+        recipients: Sequence[str],
+        data: MessageStream,
+        mail_options: List[str],
+    ) -> Tuple[Dict[str, SMTPResponse], str]:
+        """
+        Transaction one command at a time, with the message streamed into DATA
+        """
+        if self.session.supports_extension("size"):
+            mail_options = [f"size={data.size}", *mail_options]
+        encoding = "utf-8" if "SMTPUTF8" in mail_options else "ascii"
+        timeout = self.settings.TIMEOUT
+
+        try:
+            await self.session.mail(
+                sender, options=mail_options, encoding=encoding, timeout=timeout
             )
+            recipient_errors: Dict[str, SMTPResponse] = {}
+            refused: List[aiosmtplib.SMTPRecipientRefused] = []
+            for recipient in recipients:
+                try:
+                    await self.session.rcpt(
+                        recipient, encoding=encoding, timeout=timeout
+                    )
+                except aiosmtplib.SMTPRecipientRefused as error:
+                    recipient_errors[recipient] = SMTPResponse(
+                        error.code, error.message
+                    )
+                    refused.append(error)
+            if len(refused) == len(recipients):
+                raise aiosmtplib.SMTPRecipientsRefused(refused)
+
+            reply = await self.session.execute_command(b"DATA", timeout=timeout)
+            if reply.code != SMTPStatus.start_input:
+                raise aiosmtplib.SMTPDataError(reply.code, reply.message)
+        except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+            await self._reset()
+            raise
+
+        protocol = self.session.protocol
+        if protocol is None:
+            raise aiosmtplib.SMTPServerDisconnected("Server not connected")
+        try:
+            await self._write_data(protocol, data)
+            response = await protocol.read_response(timeout=timeout)
+        except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError):
+            # The server cannot tell the rest of the message from commands
+            self.session.close()
+            raise
+        if response.code != SMTPStatus.completed:
+            raise aiosmtplib.SMTPDataError(response.code, response.message)
+        return recipient_errors, response.message
+
+    async def _write_data(self, protocol, data: Union[bytes, MessageStream]) -> None:
+        """
+        Writes the message after a DATA reply, ending it with the ``.`` line
+        """
+        if isinstance(data, bytes):
+            protocol.write(PERIOD_REGEX.sub(b"..", data) + b".\r\n")
+            return
+        async for chunk in data:
+            protocol.write(chunk)
+            # Waits for the transport to flush, so chunks do not pile up in it
+            try:
+                await asyncio.wait_for(protocol._drain_helper(), self.settings.TIMEOUT)
+            except asyncio.TimeoutError as error:
+                raise aiosmtplib.SMTPTimeoutError(
+                    "Timed out writing the message"
+                ) from error
+        protocol.write(b".\r\n")
+
+    async def _reset(self) -> None:
+        try:
+            await self.session.rset()
+        except (ConnectionError, aiosmtplib.SMTPResponseException):
+            pass
+
+
+class _PipelinedReplies:
+    """
+    Collects the replies to a batch of pipelined commands
+
+    ``aiosmtplib`` waits for exactly one reply per command and discards data
+    that arrives before the next command is sent, so replies written back to
+    back by the server would be lost. While the batch is in flight the
+    protocol's receive callbacks are redirected here instead.
+    """
+
+    def __init__(self, protocol) -> None:
+        self.protocol = protocol
+        self.buffer = bytearray()
+        self.replies: asyncio.Queue = asyncio.Queue()
+
+    def __enter__(self) -> "_PipelinedReplies":
+        self.protocol.data_received = self.data_received
+        self.protocol.connection_lost = self.connection_lost
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        del self.protocol.data_received
+        del self.protocol.connection_lost
+
+    def data_received(self, data: bytes) -> None:
+        self.buffer.extend(data)
+        while True:
+            offset = 0
+            lines = []
+            while (end := self.buffer.find(b"\n", offset)) != -1:
+                line = bytes(self.buffer[offset:end])
+                offset = end + 1
+                lines.append(line)
+                if line[3:4] != b"-":
+                    break
+            else:
+                return
+
+            del self.buffer[:offset]
+            try:
+                code = int(lines[0][:3])
+            except ValueError:
+                code = SMTPStatus.invalid_response
+            message = "\n".join(
+                line[4:].strip(b" \t\r\n").decode("utf-8", "surrogateescape")
+                for line in lines
+            )
+            self.replies.put_nowait(SMTPResponse(code, message))
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        type(self.protocol).connection_lost(self.protocol, exc)
+        self.replies.put_nowait(aiosmtplib.SMTPServerDisconnected("Connection lost"))
+
+    async def read(self, timeout: Optional[float]) -> SMTPResponse:
+        try:
+            reply = await asyncio.wait_for(self.replies.get(), timeout)
+        except asyncio.TimeoutError as error:
+            raise aiosmtplib.SMTPReadTimeoutError(
+                "Timed out waiting for server response"
+            ) from error
+        if isinstance(reply, Exception):
+            self.replies.put_nowait(reply)
+            raise reply
+        return reply
+
+
+class ConnectionPool:
+    """
+    Keeps authenticated SMTP sessions open between ``send_message`` calls
+
+    :param: settings: ConnectionConfig used to open every pooled connection
+    :param: breaker: CircuitBreaker guarding new connections
+    """
+
+    def __init__(
+        self, settings: ConnectionConfig, breaker: Optional[CircuitBreaker] = None
+    ) -> None:
+        if not isinstance(settings, ConnectionConfig):
+            raise PydanticClassRequired(
+                "Configuration should be provided from ConnectionConfig class"
+            )
+        self.settings = settings
+        self.breaker = breaker
+        self._idle: Deque[Connection] = deque()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_use = 0
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """
+        Number of open connections, idle or checked out
+        """
+        return len(self._idle) + self._in_use
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the pool can be built outside of a running loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.settings.POOL_MAX_SIZE)
+        return self._slots
+
+    def _is_expired(self, connection: Connection) -> bool:
+        # Called on a connection already popped from the idle queue, so
+        # ``self.size`` no longer counts it
+        idle_for = time.monotonic() - connection.last_used
+        return (
+            idle_for >= self.settings.POOL_IDLE_TIMEOUT
+            and self.size >= self.settings.POOL_MIN_SIZE
+        )
+
+    async def _reap(self) -> None:
+        # Connections are checked out from the right end of the idle queue, so
+        # the left end holds the ones unused the longest. Without this they
+        # would only be looked at once traffic grows enough to reach them.
+        while self._idle:
+            connection = self._idle.popleft()
+            if not self._is_expired(connection):
+                self._idle.appendleft(connection)
+                return
+            await connection.close()
+
+    def is_exhausted(self, connection: Connection) -> bool:
+        """
+        Whether the connection has reached ``POOL_MAX_MESSAGES_PER_CONNECTION``
+        """
+        limit = self.settings.POOL_MAX_MESSAGES_PER_CONNECTION
+        return limit is not None and connection.messages_sent >= limit
+
+    async def open(self) -> None:
+        """
+        Opens connections up to ``POOL_MIN_SIZE`` ahead of the first send
+        """
+        while self.size < self.settings.POOL_MIN_SIZE:
+            connection = Connection(self.settings, self.breaker)
+            await connection._configure_connection()
+            self._idle.append(connection)
+
+    async def acquire(self) -> Connection:
+        """
+        Checks out a healthy connection, opening a new one when none is idle
+        """
+        if self._closed:
+            raise ConnectionErrors("Connection pool is closed")
+
+        await self._semaphore().acquire()
+        try:
+            await self._reap()
+            while self._idle:
+                connection = self._idle.pop()
+                if self._is_expired(connection) or not await connection.is_healthy():
+                    await connection.close()
+                    continue
+                self._in_use += 1
+                return connection
+
+            connection = Connection(self.settings, self.breaker)
+            await connection._configure_connection()
+        except BaseException:
+            self._semaphore().release()
+            raise
+
+        self._in_use += 1
+        return connection
+
+    async def release(self, connection: Connection, discard: bool = False) -> None:
+        """
+        Returns a connection to the pool, recycling it when it is broken or exhausted
+        """
+        self._in_use -= 1
+        self._semaphore().release()
+
+        if discard or self._closed or self.is_exhausted(connection):
+            await connection.close()
+            return
+
+        connection.last_used = time.monotonic()
+        self._idle.append(connection)
+        await self._reap()
+
+    async def aclose(self) -> None:
+        """
+        Closes every idle connection; checked out ones are closed on release
+        """
+        self._closed = True
+        while self._idle:
+            await self._idle.pop().close()
@@ -1,3 +1,6 @@
+from aiosmtplib import SMTPResponseException
+
+
 class ConnectionErrors(Exception):
     def __init__(self, expression):
         self.expression = expression
@@ -28,3 +31,30 @@ class DBProvaiderError(Exception):
 
 class EmptyMessagesList(Exception):
     pass
+
+
+class SendQueueFull(Exception):
+    pass
+
+
+class SendQueueClosed(Exception):
+    pass
+
+
+class CircuitBreakerOpen(ConnectionErrors):
+    pass
+
+
+class MessageTooLarge(SMTPResponseException):
+    """
+    The message is larger than the SIZE limit the server advertised, it was
+    refused before any of it was uploaded
+    """
+
+    def __init__(self, size: int, limit: int) -> None:
+        # 552: exceeded storage allocation, the reply RFC 1870 uses for SIZE
+        super().__init__(
+            552, f"Message size {size} exceeds the server limit of {limit} bytes"
+        )
+        self.size = size
+        self.limit = limit
@@ -1,17 +1,60 @@
+import asyncio
+import time
 from contextlib import contextmanager
-from email.message import EmailMessage, Message
+from email import message_from_bytes
 from email.utils import formataddr
-from typing import Any, Dict, Optional, Union
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Optional,
+    Union,
+)
 
 import blinker
-from jinja2 import Environment, Template
+from aiosmtplib import (
+    SMTPRecipientRefused,
+    SMTPRecipientsRefused,
+    SMTPResponse,
+    SMTPResponseException,
+    SMTPServerDisconnected,
+    SMTPStatus,
+    SMTPTimeoutError,
+)
+from jinja2 import Environment, Template, TemplateError
 from pydantic import EmailStr
 
+from fastapi_mail.attachments import AttachmentCache
 from fastapi_mail.config import ConnectionConfig
-from fastapi_mail.connection import Connection
-from fastapi_mail.errors import EmptyMessagesList, PydanticClassRequired
-from fastapi_mail.msg import MailMsg
-from fastapi_mail.schemas import MessageSchema, MessageType, MultipartSubtypeEnum
+from fastapi_mail.connection import Connection, ConnectionPool
+from fastapi_mail.errors import (
+    EmptyMessagesList,
+    MessageTooLarge,
+    PydanticClassRequired,
+    SendQueueClosed,
+    SendQueueFull,
+)
+from fastapi_mail.msg import MailBatch, MailMsg, PreparedMessage
+from fastapi_mail.ratelimit import RateLimiter
+from fastapi_mail.relay import Relay, RelayGroup
+from fastapi_mail.render import TemplateRenderer
+from fastapi_mail.retry import RetryPolicy
+from fastapi_mail.schemas import (
+    MessageSchema,
+    MessageType,
+    MultipartSubtypeEnum,
+    Personalization,
+    SendResult,
+    TemplateWarmup,
+)
+from fastapi_mail.send_queue import SendQueue
+from fastapi_mail.spool import Spool, SpoolStatus
 
 
 class _MailMixin:
@@ -45,10 +88,140 @@ class _MailMixin:
 class FastMail(_MailMixin):
     """
     FastMail builds the message from the config
+
+    :param: config: ConnectionConfig of the relay, also used for templates,
+    the default sender and the queue, spool and rate limit settings
+    :param: retry_policy: RetryPolicy for failed messages, none are retried without
+    :param: relays: RelayGroup, or a list of Relays, to send through instead of
+    the relay in ``config``
     """
 
-    def __init__(self, config: ConnectionConfig) -> None:
+    def __init__(
+        self,
+        config: ConnectionConfig,
+        retry_policy: Optional[RetryPolicy] = None,
+        relays: Optional[Union[RelayGroup, list[Relay]]] = None,
+    ) -> None:
         self.config = config
+        self.retry_policy = retry_policy
+        if relays is None:
+            relays = RelayGroup([Relay(config)])
+        elif not isinstance(relays, RelayGroup):
+            relays = RelayGroup(relays)
+        self.relays = relays
+        # Pool and quotas of the first relay, the only one unless ``relays``
+        # is given
+        self.pool: Optional[ConnectionPool] = relays.relays[0].pool
+        self.rate_limiter: RateLimiter = relays.relays[0].rate_limiter
+        self.renderer = TemplateRenderer(config)
+        self.attachment_cache = AttachmentCache.from_config(config)
+        self.queue = SendQueue(config.QUEUE_MAX_SIZE, config.QUEUE_WORKERS)
+        self.spool: Optional[Spool] = (
+            Spool(config.SPOOL_PATH, config.SPOOL_COMMIT_INTERVAL)
+            if config.SPOOL_PATH
+            else None
+        )
+
+    async def enqueue(
+        self,
+        message: Union[MessageSchema, list[MessageSchema]],
+        template_name: Optional[str] = None,
+        html_template: Optional[str] = None,
+        plain_template: Optional[str] = None,
+        wait: bool = True,
+    ) -> "asyncio.Future[list[SendResult]]":
+        """
+        Hands messages to the background send queue and returns right away
+
+        The returned future resolves to a ``SendResult`` per message once the
+        workers have sent them; it does not have to be awaited. When the queue
+        holds ``QUEUE_MAX_SIZE`` entries the call waits for room, or raises
+        ``SendQueueFull`` if ``wait`` is ``False``.
+
+        With ``SPOOL_PATH`` set the messages are prepared and written to the
+        spool before the call returns, so they survive a restart.
+        """
+        messages = self.__normalize_messages(message)
+        if self.spool is None:
+            send = partial(
+                self.send_bulk, messages, template_name, html_template, plain_template
+            )
+            return await self.queue.put(send, len(messages), wait=wait)
+
+        if not wait and self.queue.full:
+            raise SendQueueFull(f"Send queue is full ({self.queue.max_size} entries)")
+        prepared_messages = await self.__prepare_messages_for_sending(
+            messages, template_name, html_template, plain_template
+        )
+        spool_ids = await self.__spool(self.spool, prepared_messages)
+        send = partial(
+            self.__send_prepared_messages,
+            prepared_messages,
+            self.config.SEND_CONCURRENCY,
+            raise_errors=False,
+            spool_ids=spool_ids,
+        )
+        try:
+            return await self.queue.put(send, len(messages), wait=wait)
+        except (SendQueueFull, SendQueueClosed) as error:
+            await asyncio.gather(
+                *(
+                    self.spool.mark(spool_id, SpoolStatus.failed, 0, str(error))
+                    for spool_id in spool_ids
+                )
+            )
+            raise
+
+    async def drain(self) -> None:
+        """
+        Waits until every queued message has been handled
+        """
+        await self.queue.drain()
+
+    async def aclose(self) -> None:
+        """
+        Drains the send queue, closes pooled SMTP connections and stops the
+        render pool, call it on application shutdown
+        """
+        await self.queue.aclose()
+        await self.relays.aclose()
+        self.renderer.close()
+        if self.spool is not None:
+            await self.spool.aclose()
+
+    async def warm_templates(
+        self,
+        templates: Optional[list[str]] = None,
+        extensions: Optional[list[str]] = None,
+    ) -> TemplateWarmup:
+        """
+        Loads and compiles templates ahead of the first send
+
+        Call it from the FastAPI lifespan so the first request that sends a
+        templated email does not pay for compiling it. Templates beyond
+        ``TEMPLATE_CACHE_SIZE`` push earlier ones out of the cache.
+
+        :param: templates: Names to compile, every template in
+        ``TEMPLATE_FOLDER`` by default
+        :param: extensions: Only compile templates with these file extensions
+        when walking ``TEMPLATE_FOLDER``, e.g. ``["html", "jinja"]``
+        """
+        env = self.config.template_engine()
+        if templates is None:
+            templates = env.list_templates(extensions=extensions)
+
+        started = time.perf_counter()
+        warmup = TemplateWarmup()
+        for name in templates:
+            try:
+                env.get_template(name)
+            except (TemplateError, UnicodeDecodeError, OSError) as error:
+                # Binary or unreadable files in the folder are reported too
+                warmup.failed[name] = f"{type(error).__name__}: {error}"
+            else:
+                warmup.compiled.append(name)
+        warmup.elapsed = time.perf_counter() - started
+        return warmup
 
     async def get_mail_template(
         self, env_path: Environment, template_name: str
@@ -68,25 +241,27 @@ class FastMail(_MailMixin):
             )
 
     async def __prepare_message(
-        self, message: MessageSchema, template: Optional[Template] = None
-    ) -> Union[EmailMessage, Message]:
+        self,
+        message: MessageSchema,
+        template: Optional[Template] = None,
+        batch: Optional[MailBatch] = None,
+    ) -> PreparedMessage:
         if template and message.template_body is not None:
             message.template_body = await self.__template_message_builder(
                 message, template
             )
-        msg = MailMsg(message)
-        sender = await self.__sender(message)
-        return await msg._message(sender)
+        return await self.__build(message, batch)
 
     async def __prepare_html_and_plain_message(
         self,
         message: MessageSchema,
         html_template: Template,
         plain_template: Template,
-    ) -> Union[EmailMessage, Message]:
+        batch: Optional[MailBatch] = None,
+    ) -> PreparedMessage:
         template_data = self.check_data(message.template_body)
-        html = html_template.render(**template_data)
-        plain = plain_template.render(**template_data)
+        html = await self.renderer.render(html_template, template_data)
+        plain = await self.renderer.render(plain_template, template_data)
 
         message.multipart_subtype = MultipartSubtypeEnum.alternative
         if message.subtype == MessageType.html:
@@ -96,18 +271,35 @@ class FastMail(_MailMixin):
             message.template_body = plain
             message.alternative_body = html
 
-        msg = MailMsg(message)
+        return await self.__build(message, batch)
+
+    async def __build(
+        self, message: MessageSchema, batch: Optional[MailBatch] = None
+    ) -> PreparedMessage:
+        msg = MailMsg(message, batch)
         sender = await self.__sender(message)
-        return await msg._message(sender)
+        if batch is None or batch.prototypes is None:
+            built = await msg._message(sender)
+        else:
+            key = msg._prototype_key()
+            prototype = batch.prototypes.get(key)
+            if prototype is None:
+                # Only the latest body is kept, bulk sends repeat it back to back
+                batch.prototypes.clear()
+                prototype = batch.prototypes[key] = await msg._prototype()
+            built = msg._from_prototype(prototype, sender)
+        return PreparedMessage(
+            built, message.from_email or self.config.MAIL_FROM, msg._envelope()
+        )
 
     async def __template_message_builder(
         self, message: MessageSchema, template: Template
     ) -> str:
         if isinstance(message.template_body, list):
-            return template.render({"body": message.template_body})
+            return await self.renderer.render(template, {"body": message.template_body})
         else:
             template_data = self.check_data(message.template_body)
-            return template.render(**template_data)
+            return await self.renderer.render(template, template_data)
 
     async def __sender(self, message: MessageSchema) -> Union[EmailStr, str]:
         sender = message.from_email or self.config.MAIL_FROM
@@ -121,12 +313,172 @@ class FastMail(_MailMixin):
         template_name: Optional[str] = None,
         html_template: Optional[str] = None,
         plain_template: Optional[str] = None,
+        concurrency: Optional[int] = None,
     ) -> None:
+        """
+        Sends one message or a list of messages
+
+        :param: concurrency: Number of SMTP sessions a message list is spread
+        over, defaults to ``SEND_CONCURRENCY`` from the config
+        """
         messages = self.__normalize_messages(message)
+        concurrency = concurrency or self.config.SEND_CONCURRENCY
+        if self.config.SEND_PIPELINE_WINDOW:
+            await self.__send_pipelined(
+                messages, template_name, html_template, plain_template, concurrency
+            )
+            return
+        prepared_messages = await self.__prepare_messages_for_sending(
+            messages, template_name, html_template, plain_template
+        )
+        await self.__send_prepared_messages(prepared_messages, concurrency)
+
+    async def send_bulk(
+        self,
+        messages: list[MessageSchema],
+        template_name: Optional[str] = None,
+        html_template: Optional[str] = None,
+        plain_template: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> list[SendResult]:
+        """
+        Sends a list of messages and reports the outcome of each one
+
+        Unlike ``send_message`` a failed message does not stop the batch: a
+        dropped connection is reopened and sending resumes with the next
+        unsent message. Results are returned in the order of ``messages``.
+        """
+        messages = self.__normalize_messages(messages)
+        concurrency = concurrency or self.config.SEND_CONCURRENCY
+        if self.config.SEND_PIPELINE_WINDOW:
+            return await self.__send_pipelined(
+                messages,
+                template_name,
+                html_template,
+                plain_template,
+                concurrency,
+                raise_errors=False,
+            )
         prepared_messages = await self.__prepare_messages_for_sending(
             messages, template_name, html_template, plain_template
         )
-        await self.__send_prepared_messages(prepared_messages)
+        return await self.__send_prepared_messages(
+            prepared_messages, concurrency, raise_errors=False
+        )
+
+    async def replay_spool(self, concurrency: Optional[int] = None) -> list[SendResult]:
+        """
+        Sends the messages left pending in the spool by a previous process
+
+        Call it once on startup, before new messages are sent, e.g. from the
+        FastAPI lifespan. Returns a ``SendResult`` per replayed message.
+        """
+        if self.spool is None:
+            raise ValueError("Replaying requires ``SPOOL_PATH`` in the config")
+
+        entries = await self.spool.entries(SpoolStatus.pending)
+        if not entries:
+            return []
+        # Sent as stored, the parsed message is only for the dispatch signal
+        return await self.__send_prepared_messages(
+            [
+                PreparedMessage(
+                    message_from_bytes(entry.data),
+                    entry.sender,
+                    entry.recipients,
+                    entry.data,
+                )
+                for entry in entries
+            ],
+            concurrency or self.config.SEND_CONCURRENCY,
+            raise_errors=False,
+            spool_ids=[entry.id for entry in entries],
+        )
+
+    async def send_personalized(
+        self,
+        message: MessageSchema,
+        recipients: Union[Iterable[Personalization], AsyncIterable[Personalization]],
+        template_name: Optional[str] = None,
+        html_template: Optional[str] = None,
+        plain_template: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        window: int = 100,
+    ) -> AsyncIterator[SendResult]:
+        """
+        Sends one message per recipient, rendered with its own template data
+
+        ``recipients`` is read lazily, and each message is rendered, built and
+        sent in turn, so no more than ``window`` messages are held at a time
+        however long the list is. Yields a ``SendResult`` per message as it
+        completes; a failed message does not stop the others.
+
+        :param: message: Fields shared by every message; its ``recipients``
+        are ignored
+        :param: recipients: Personalization per message, or an async
+        iterator of them, e.g. rows streamed from a database
+        :param: window: Most messages prepared ahead of sending and results
+        waiting to be consumed
+        """
+        results: "asyncio.Queue[Optional[SendResult]]" = asyncio.Queue(window)
+
+        async def items() -> AsyncIterator[tuple[PreparedMessage, Optional[int]]]:
+            async for prepared in self.__prepare_stream(
+                self.__personalize(message, recipients),
+                template_name,
+                html_template,
+                plain_template,
+            ):
+                yield prepared, None
+                await asyncio.sleep(0)
+
+        async def publish(
+            index: int, prepared: PreparedMessage, result: SendResult
+        ) -> None:
+            if result.success:
+                email_dispatched.send(prepared.message)
+            await results.put(result)
+
+        async def send() -> None:
+            try:
+                await self.__send_stream(
+                    items(),
+                    publish,
+                    concurrency or self.config.SEND_CONCURRENCY,
+                    raise_errors=False,
+                    window=window,
+                )
+            except asyncio.CancelledError:
+                # The consumer went away, nobody is waiting for the end marker
+                raise
+            except Exception:
+                await results.put(None)
+                raise
+            await results.put(None)
+
+        sending = asyncio.ensure_future(send())
+        try:
+            while (result := await results.get()) is not None:
+                yield result
+            # Raises what stopped the batch, e.g. a template that does not render
+            await sending
+        finally:
+            if not sending.done():
+                sending.cancel()
+                await asyncio.gather(sending, return_exceptions=True)
+
+    async def __personalize(
+        self,
+        message: MessageSchema,
+        recipients: Union[Iterable[Personalization], AsyncIterable[Personalization]],
+    ) -> AsyncIterator[MessageSchema]:
+        async for personalization in self.__iterate(recipients):
+            update: Dict[str, Any] = {"recipients": [personalization.recipient]}
+            if personalization.template_body is not None:
+                update["template_body"] = personalization.template_body
+            if personalization.subject is not None:
+                update["subject"] = personalization.subject
+            yield message.model_copy(update=update)
 
     def __normalize_messages(
         self, message: Union[MessageSchema, list[MessageSchema]]
@@ -157,15 +509,34 @@ class FastMail(_MailMixin):
         template_name: Optional[str],
         html_template: Optional[str],
         plain_template: Optional[str],
-    ) -> list[Union[EmailMessage, Message]]:
-        prepared_messages: list[Union[EmailMessage, Message]] = []
+    ) -> list[PreparedMessage]:
+        return [
+            prepared
+            async for prepared in self.__prepare_stream(
+                messages, template_name, html_template, plain_template
+            )
+        ]
 
+    async def __prepare_stream(
+        self,
+        messages: Union[Iterable[MessageSchema], AsyncIterable[MessageSchema]],
+        template_name: Optional[str],
+        html_template: Optional[str],
+        plain_template: Optional[str],
+    ) -> AsyncIterator[PreparedMessage]:
         template_env: Optional[Environment] = None
         template_obj: Optional[Template] = None
         html_template_obj: Optional[Template] = None
         plain_template_obj: Optional[Template] = None
+        batch = MailBatch(
+            self.config.USE_MIME_PROTOTYPES,
+            self.attachment_cache,
+            # Spooled messages are stored whole, their attachments cannot be streamed
+            None if self.spool is not None else self.config.ATTACHMENT_STREAM_THRESHOLD,
+            self.config.MAIL_MSGID_DOMAIN,
+        )
 
-        for msg in messages:
+        async for msg in self.__iterate(messages):
             if self.config.TEMPLATE_FOLDER and (
                 template_name or (html_template and plain_template)
             ):
@@ -176,7 +547,7 @@ class FastMail(_MailMixin):
                         template_obj = await self.get_mail_template(
                             template_env, template_name
                         )
-                    prepared = await self.__prepare_message(msg, template_obj)
+                    prepared = await self.__prepare_message(msg, template_obj, batch)
                 else:
                     if template_env is None:
                         template_env = self.config.template_engine()  # type: ignore
@@ -189,25 +560,381 @@ class FastMail(_MailMixin):
                             template_env, plain_template or ""
                         )
                     prepared = await self.__prepare_html_and_plain_message(
-                        msg, html_template_obj, plain_template_obj
+                        msg, html_template_obj, plain_template_obj, batch
                     )
             else:
-                prepared = await self.__prepare_message(msg)
+                prepared = await self.__prepare_message(msg, batch=batch)
+
+            yield prepared
+
+    @staticmethod
+    async def __iterate(
+        source: Union[Iterable[Any], AsyncIterable[Any]],
+    ) -> AsyncIterator[Any]:
+        if isinstance(source, AsyncIterable):
+            async for item in source:
+                yield item
+        else:
+            for item in source:
+                yield item
+
+    async def __open_session(self, exclude: Collection[Relay] = ()) -> Connection:
+        return await self.relays.acquire(exclude)
 
-            prepared_messages.append(prepared)
+    async def __close_session(self, session: Connection, discard: bool = False) -> None:
+        await self.relays.release(session, discard=discard)
 
-        return prepared_messages
+    def __is_exhausted(self, session: Connection) -> bool:
+        return session.relay is not None and session.relay.is_exhausted(session)
+
+    def __is_broken(self, session: Connection, error: Exception) -> bool:
+        if isinstance(error, (SMTPServerDisconnected, SMTPTimeoutError)):
+            return True
+        # aiosmtplib hangs up by itself on a 421 reply
+        return not self.config.SUPPRESS_SEND and not session.session.is_connected
+
+    async def __transmit(
+        self,
+        session: Connection,
+        prepared: PreparedMessage,
+    ) -> SendResult:
+        result = SendResult(message_id=prepared.message["Message-ID"])
+        if self.config.SUPPRESS_SEND:
+            errors: Dict[str, SMTPResponse] = {}
+        else:
+            errors = await self.__send_envelopes(session, prepared, result)
+            result.code = SMTPStatus.completed
+            result.size = prepared.size
+
+        result.refused = {
+            address: (reply.code, reply.message) for address, reply in errors.items()
+        }
+        result.accepted = [
+            address for address in prepared.recipients if address not in errors
+        ]
+        return result
+
+    async def __send_envelopes(
+        self, session: Connection, prepared: PreparedMessage, result: SendResult
+    ) -> Dict[str, SMTPResponse]:
+        """
+        Sends the message in envelopes of at most ``MAX_RECIPIENTS_PER_ENVELOPE``
+        recipients of the session's relay, every one with the same DATA
+        """
+        recipients = prepared.recipients
+        size = session.settings.MAX_RECIPIENTS_PER_ENVELOPE or len(recipients)
+        if size >= len(recipients):
+            errors, result.response = await session.sendmail(
+                prepared.sender, recipients, prepared.payload
+            )
+            return errors
+
+        while (start := prepared.handled) < len(recipients):
+            end = start + size
+            try:
+                errors, result.response = await session.sendmail(
+                    prepared.sender, recipients[start:end], prepared.payload
+                )
+            except SMTPRecipientsRefused as error:
+                # Other envelopes may still get through, the message only
+                # fails when every recipient is refused
+                errors = {
+                    refused.recipient: SMTPResponse(refused.code, refused.message)
+                    for refused in error.recipients
+                }
+            prepared.refused.update(errors)
+            prepared.handled = end
+
+        if all(address in prepared.refused for address in recipients):
+            refused = prepared.refused
+            # Nothing was delivered, a retry starts over with every envelope
+            prepared.handled, prepared.refused = 0, {}
+            raise SMTPRecipientsRefused(
+                [
+                    SMTPRecipientRefused(reply.code, reply.message, address)
+                    for address, reply in refused.items()
+                ]
+            )
+        return prepared.refused
+
+    @staticmethod
+    def __failed_result(prepared: PreparedMessage, error: Exception) -> SendResult:
+        result = SendResult(
+            message_id=prepared.message["Message-ID"],
+            size=prepared.size if prepared.serialized else None,
+            error=str(error),
+        )
+        if isinstance(error, SMTPRecipientsRefused):
+            result.refused = {
+                refused.recipient: (refused.code, refused.message)
+                for refused in error.recipients
+            }
+        elif isinstance(error, SMTPResponseException):
+            result.code, result.response = error.code, error.message
+
+        handled = prepared.handled
+        if handled:
+            # Envelopes sent before the failure were delivered all the same,
+            # only the recipients of the rest failed
+            result.accepted = [
+                address
+                for address in prepared.recipients[:handled]
+                if address not in prepared.refused
+            ]
+            result.refused = {
+                address: (reply.code, reply.message)
+                for address, reply in prepared.refused.items()
+            }
+            if isinstance(error, SMTPResponseException):
+                for address in prepared.recipients[handled:]:
+                    result.refused[address] = (error.code, error.message)
+        return result
+
+    async def __spool(
+        self, spool: Spool, prepared_messages: list[PreparedMessage]
+    ) -> list[int]:
+        return await spool.add(
+            [
+                (
+                    prepared.message["Message-ID"],
+                    prepared.sender,
+                    prepared.recipients,
+                    prepared.data,
+                )
+                for prepared in prepared_messages
+            ]
+        )
 
     async def __send_prepared_messages(
-        self, prepared_messages: list[Union[EmailMessage, Message]]
-    ) -> None:
-        async with Connection(self.config) as session:
-            if not self.config.SUPPRESS_SEND:
-                for prepared in prepared_messages:
-                    await session.session.send_message(prepared)
+        self,
+        prepared_messages: list[PreparedMessage],
+        concurrency: int = 1,
+        raise_errors: bool = True,
+        spool_ids: Optional[list[int]] = None,
+    ) -> list[SendResult]:
+        if self.spool is not None and spool_ids is None:
+            spool_ids = await self.__spool(self.spool, prepared_messages)
+
+        results: list[Optional[SendResult]] = [None] * len(prepared_messages)
+
+        async def items() -> AsyncIterator[tuple[PreparedMessage, Optional[int]]]:
+            for index, prepared in enumerate(prepared_messages):
+                yield prepared, spool_ids[index] if spool_ids else None
+
+        async def collect(
+            index: int, prepared: PreparedMessage, result: SendResult
+        ) -> None:
+            results[index] = result
+
+        await self.__send_stream(
+            items(),
+            collect,
+            min(concurrency, len(prepared_messages)),
+            raise_errors,
+            window=len(prepared_messages),
+        )
+
+        for prepared, result in zip(prepared_messages, results):
+            if result is not None and result.success:
+                email_dispatched.send(prepared.message)
+        return [result for result in results if result is not None]
+
+    async def __send_pipelined(
+        self,
+        messages: list[MessageSchema],
+        template_name: Optional[str],
+        html_template: Optional[str],
+        plain_template: Optional[str],
+        concurrency: int,
+        raise_errors: bool = True,
+    ) -> list[SendResult]:
+        # Messages are prepared while earlier ones are sent, so unlike a
+        # two-phase send each one is dispatched as soon as it went out
+        results: list[Optional[SendResult]] = [None] * len(messages)
+
+        async def items() -> AsyncIterator[tuple[PreparedMessage, Optional[int]]]:
+            async for prepared in self.__prepare_stream(
+                messages, template_name, html_template, plain_template
+            ):
+                yield prepared, None
+                # Lets a session start on the message before the next is prepared
+                await asyncio.sleep(0)
+
+        async def collect(
+            index: int, prepared: PreparedMessage, result: SendResult
+        ) -> None:
+            if result.success:
+                email_dispatched.send(prepared.message)
+            results[index] = result
+
+        await self.__send_stream(
+            items(),
+            collect,
+            min(concurrency, len(messages)),
+            raise_errors,
+            window=self.config.SEND_PIPELINE_WINDOW or 1,
+        )
+        return [result for result in results if result is not None]
 
-        for prepared in prepared_messages:
-            email_dispatched.send(prepared)
+    async def __send_stream(
+        self,
+        items: AsyncIterator[tuple[PreparedMessage, Optional[int]]],
+        on_result: Callable[[int, PreparedMessage, SendResult], Awaitable[None]],
+        concurrency: int = 1,
+        raise_errors: bool = True,
+        window: int = 1,
+    ) -> None:
+        # Prepared messages wait here for a free session. The bound keeps a
+        # fast producer from getting more than ``window`` messages ahead.
+        queue: "asyncio.Queue[Any]" = asyncio.Queue(window)
+        # Spool rows written for messages that have no outcome yet
+        unsent: Dict[int, int] = {}
+        writes: Dict[int, "asyncio.Future[list[int]]"] = {}
+        # Outcomes are committed to the spool in groups while sending goes on
+        spool_marks: set["asyncio.Future[None]"] = set()
+
+        def mark(index: int, status: SpoolStatus, attempts: int, error: Any) -> None:
+            spool_id = unsent.pop(index, None)
+            if self.spool is None or spool_id is None:
+                return
+            future = self.spool.mark(spool_id, status, attempts, error)
+            spool_marks.add(future)
+            future.add_done_callback(spool_marks.discard)
+
+        async def deliver(
+            session: Optional[Connection], prepared: PreparedMessage
+        ) -> tuple[Optional[Connection], SendResult]:
+            started = time.perf_counter()
+            attempt = 1
+            # Relays whose SIZE limit the message exceeds
+            oversized: set[Relay] = set()
+            # The session belongs to deliver until it returns: whatever it
+            # holds when an error escapes is released here, not by the caller
+            try:
+                while True:
+                    try:
+                        if session is None:
+                            session = await self.__open_session(oversized)
+                        # Charged to the quotas of the relay the message goes through
+                        if (
+                            session.relay is not None
+                            and session.relay.rate_limiter.enabled
+                        ):
+                            await session.relay.rate_limiter.acquire(
+                                len(prepared.recipients)
+                            )
+                        result = await self.__transmit(session, prepared)
+                        session.messages_sent += 1
+                        if session.relay is not None:
+                            self.relays.record_success(session.relay)
+                        break
+                    except Exception as error:
+                        if (
+                            isinstance(error, MessageTooLarge)
+                            and session is not None
+                            and session.relay is not None
+                        ):
+                            oversized.add(session.relay)
+                            if any(
+                                relay not in oversized for relay in self.relays.relays
+                            ):
+                                # Nothing was uploaded, another relay may take it
+                                released, session = session, None
+                                await self.__close_session(released)
+                                continue
+                        if session is not None and self.__is_broken(session, error):
+                            if session.relay is not None:
+                                self.relays.record_failure(session.relay)
+                            broken, session = session, None
+                            await self.__close_session(broken, discard=True)
+                        delay = None
+                        if self.retry_policy is not None:
+                            delay = self.retry_policy.next_delay(
+                                error, attempt, time.perf_counter() - started
+                            )
+                        if delay is None:
+                            if raise_errors:
+                                raise
+                            result = self.__failed_result(prepared, error)
+                            break
+                        await asyncio.sleep(delay)
+                        attempt += 1
+            except BaseException:
+                if session is not None:
+                    await self.__close_session(session, discard=True)
+                raise
+
+            result.attempts = attempt
+            result.elapsed = time.perf_counter() - started
+            return session, result
+
+        async def produce() -> None:
+            index = 0
+            async for prepared, spool_id in items:
+                if spool_id is not None:
+                    unsent[index] = spool_id
+                elif self.spool is not None:
+                    # Written ahead while earlier messages are being sent
+                    writes[index] = asyncio.ensure_future(
+                        self.__spool(self.spool, [prepared])
+                    )
+                await queue.put((index, prepared))
+                index += 1
+            for _ in workers:
+                await queue.put(None)
+
+        async def worker() -> None:
+            # Sessions pull the next message from the shared queue, so a slow
+            # connection never holds up messages the others could send
+            session: Optional[Connection] = None
+            try:
+                while (item := await queue.get()) is not None:
+                    index, prepared = item
+                    if index in writes:
+                        # A message is on disk before it goes out
+                        (unsent[index],) = await writes.pop(index)
+                    # Handed over to deliver, which gives back the session to go on with
+                    held, session = session, None
+                    session, result = await deliver(held, prepared)
+                    mark(
+                        index,
+                        SpoolStatus.sent if result.success else SpoolStatus.failed,
+                        result.attempts,
+                        result.error,
+                    )
+                    await on_result(index, prepared, result)
+                    # A pooled connection is recycled once it hits its message cap
+                    if session is not None and self.__is_exhausted(session):
+                        await self.__close_session(session)
+                        session = None
+            except BaseException:
+                if session is not None:
+                    await self.__close_session(session, discard=True)
+                raise
+            if session is not None:
+                await self.__close_session(session)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        tasks = [asyncio.ensure_future(produce()), *workers]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException as error:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if isinstance(error, Exception) and self.spool is not None:
+                # The caller is told the batch failed, so nothing of it is left
+                # pending for a later replay to send behind its back. Cancelled
+                # batches stay pending, they are what a replay is for.
+                written = await asyncio.gather(*writes.values(), return_exceptions=True)
+                for index, spool_ids in zip(list(writes), written):
+                    if isinstance(spool_ids, list):
+                        unsent[index] = spool_ids[0]
+                for index in list(unsent):
+                    mark(index, SpoolStatus.failed, 0, str(error))
+                await asyncio.gather(*spool_marks)
+            raise
+        await asyncio.gather(*spool_marks)
 
 
 signals = blinker.Namespace()
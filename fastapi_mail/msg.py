@@ -1,17 +1,70 @@
+import copy
+import hashlib
+import itertools
+import os
+import secrets
+import socket
 import sys
 import time
 from email.encoders import encode_base64
+from email.generator import BytesGenerator
 from email.message import EmailMessage, Message
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.utils import formatdate, make_msgid
-from typing import Any, Union
+from email.policy import compat32
+from email.utils import formatdate
+from io import BytesIO
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
 
+from aiosmtplib import SMTPResponse
+
+from .attachments import AttachmentCache, FileAttachment, MessageStream, StreamedPart
 from .schemas import MessageType, MultipartSubtypeEnum
 
 PY3 = sys.version_info[0] == 3
 
+# Serializes with the CRLF line endings DATA uses. Base64 and quoted-printable
+# parts are 7bit clean, so the same bytes are valid whether or not the server
+# supports 8BITMIME, and there are no "From " lines to mangle.
+SMTP_POLICY = compat32.clone(linesep="\r\n", cte_type="7bit", mangle_from_=False)
+
+
+_msgid_prefix: Optional[str] = None
+_msgid_counter = itertools.count()
+_fqdn: Optional[str] = None
+
+
+def _reset_msgid_prefix() -> None:
+    global _msgid_prefix
+    _msgid_prefix = None
+
+
+# A forked worker would otherwise repeat the IDs of its parent. Windows has
+# no fork, nor os.register_at_fork
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_msgid_prefix)
+
+
+def make_message_id(domain: Optional[str] = None) -> str:
+    """
+    Returns a unique Message-ID without a system call or DNS lookup per call
+
+    Unlike ``email.utils.make_msgid`` the host name is looked up once per
+    process, and uniqueness comes from random bits drawn at startup and a
+    counter instead of the time and pid of every call.
+
+    :param: domain: Right-hand side of the ID, the host's FQDN by default
+    """
+    global _msgid_prefix, _fqdn
+    if _msgid_prefix is None:
+        _msgid_prefix = f"{int(time.time())}.{os.getpid()}.{secrets.token_hex(8)}"
+    if domain is None:
+        if _fqdn is None:
+            _fqdn = socket.getfqdn()
+        domain = _fqdn
+    return f"<{_msgid_prefix}.{next(_msgid_counter)}@{domain}>"
+
 
 class MailMsg:
     """
@@ -32,9 +85,32 @@ class MailMsg:
     nature of the parts of the message and their relationship to each other
     according to the MIME standard
     :param: headers: Dict of custom SMTP headers
+    :param: batch: MailBatch of the send call, shares encoded attachments
+    between its messages
     """
 
-    def __init__(self, entries) -> None:
+    # Built once per message of a bulk send, slots keep that cheap
+    __slots__ = (
+        "batch",
+        "recipients",
+        "attachments",
+        "subject",
+        "body",
+        "alternative_body",
+        "template_body",
+        "cc",
+        "bcc",
+        "reply_to",
+        "charset",
+        "subtype",
+        "multipart_subtype",
+        "headers",
+        "msgId",
+        "message",
+    )
+
+    def __init__(self, entries, batch: Optional["MailBatch"] = None) -> None:
+        self.batch = batch
         self.recipients = entries.recipients
         self.attachments = entries.attachments
         self.subject = entries.subject
@@ -51,7 +127,7 @@ class MailMsg:
         if self.headers and "message-id" in self.headers:
             self.msgId = self.headers["message-id"]
         else:
-            self.msgId = make_msgid()
+            self.msgId = make_message_id(batch.msgid_domain if batch else None)
 
     def _mimetext(self, text: str, subtype: str) -> MIMEText:
         """
@@ -64,37 +140,101 @@ class MailMsg:
         Creates a MIMEBase object
         """
         for file, file_meta in attachment:
-            if file_meta and "mime_type" in file_meta and "mime_subtype" in file_meta:
-                part = MIMEBase(
-                    _maintype=file_meta["mime_type"], _subtype=file_meta["mime_subtype"]
-                )
-            else:
-                part = MIMEBase(_maintype="application", _subtype="octet-stream")
+            self.message.attach(await self._attachment_part(file, file_meta))
 
-            await file.seek(0) 
-            part.set_payload(await file.read())
-            encode_base64(part)
+    async def _attachment_part(self, file: Any, file_meta: Any) -> MIMEBase:
+        """
+        Reads and encodes an attachment, or reuses the part already encoded
+        for the same file or the same content in this batch
+        """
+        batch = self.batch
+        meta = repr(file_meta)
+        if batch is not None and (id(file), meta) in batch.parts:
+            return batch.parts[id(file), meta][1]
+
+        content = None
+        size = file.size
+        if isinstance(file, FileAttachment):
+            # Identified without reading, the file is only read on a miss
+            digest = await file.fingerprint()
+            size = file.size
+        elif batch is not None and batch.streams(size):
+            digest = ""
+        else:
+            await file.seek(0)
+            content = await file.read()
             await file.close()
+            digest = hashlib.sha256(content).hexdigest() if batch is not None else ""
 
-            if file_meta and "headers" in file_meta:
-                for header in file_meta["headers"].keys():
-                    part.add_header(header, file_meta["headers"][header])
+        if batch is not None and (digest, file.filename, meta) in batch.parts:
+            part = batch.parts[digest, file.filename, meta][1]
+            batch.parts[id(file), meta] = (file, part)
+            return part
 
-            # Add an implicit `Content-Disposition` attachment header,
-            #   but only if it wasn't supplied explicitly.
-            #   More info here: https://github.com/sabuhish/fastapi-mail/issues/128
-            if not part.get("Content-Disposition"):
-                filename = file.filename
-                try:
-                    filename and filename.encode("ascii")
-                except UnicodeEncodeError:
-                    if not PY3:
-                        filename = filename.encode("utf8")
+        if file_meta and "mime_type" in file_meta and "mime_subtype" in file_meta:
+            maintype, subtype = file_meta["mime_type"], file_meta["mime_subtype"]
+        else:
+            maintype, subtype = "application", "octet-stream"
+
+        if batch is not None and batch.streams(size):
+            # Encoded while it is sent, see MessageStream
+            part = StreamedPart(maintype, subtype, file, size)
+        else:
+            part = MIMEBase(_maintype=maintype, _subtype=subtype)
+            await self._encode_part(part, file, content, digest)
+
+        if file_meta and "headers" in file_meta:
+            for header in file_meta["headers"].keys():
+                part.add_header(header, file_meta["headers"][header])
 
-                filename = ("UTF8", "", filename)
-                part.add_header("Content-Disposition", "attachment", filename=filename)
+        # Add an implicit `Content-Disposition` attachment header,
+        #   but only if it wasn't supplied explicitly.
+        #   More info here: https://github.com/sabuhish/fastapi-mail/issues/128
+        if not part.get("Content-Disposition"):
+            filename = file.filename
+            try:
+                filename and filename.encode("ascii")
+            except UnicodeEncodeError:
+                if not PY3:
+                    filename = filename.encode("utf8")
 
-            self.message.attach(part)
+            filename = ("UTF8", "", filename)
+            part.add_header("Content-Disposition", "attachment", filename=filename)
+
+        if batch is not None:
+            # The file is kept referenced so its id is not reused in the batch
+            batch.parts[id(file), meta] = (file, part)
+            if digest:
+                batch.parts[digest, file.filename, meta] = (file, part)
+        return part
+
+    async def _encode_part(
+        self, part: MIMEBase, file: Any, content: Optional[bytes], digest: str
+    ) -> None:
+        """
+        Sets the base64 encoded content of the file as payload of the part
+        """
+        cache = self.batch.cache if self.batch is not None else None
+        # Path fingerprints do not hash the content, so they are not trusted
+        # across restarts and stay out of the disk tier
+        disk = not isinstance(file, FileAttachment)
+        payload = await cache.get(digest, disk) if cache is not None else None
+        if payload is None:
+            if isinstance(file, FileAttachment):
+                # Large files reach the encoder as an mmap, not a copy;
+                # encode_base64 takes any buffer, the stubs only name bytes
+                part.set_payload(await file.content())  # type: ignore[arg-type]
+            else:
+                part.set_payload(content if content is not None else await file.read())
+            encode_base64(part)
+            if cache is not None:
+                encoded = part.get_payload()
+                # encode_base64 always leaves an ASCII string as payload
+                assert isinstance(encoded, str)
+                await cache.put(digest, encoded, disk)
+        else:
+            part.set_payload(payload)
+            part["Content-Transfer-Encoding"] = "base64"
 
     def attach_alternative(self, message: MIMEMultipart) -> MIMEMultipart:
         """
@@ -111,9 +251,9 @@ class MailMsg:
         message.attach(tmpmsg)
         return message
 
-    async def _message(self, sender: str) -> Union[EmailMessage, Message]:
+    async def _body(self) -> MIMEMultipart:
         """
-        Creates the email message
+        Creates the MIME tree of the body and attachments
         """
 
         self.message = MIMEMultipart(self.multipart_subtype.value)
@@ -130,30 +270,246 @@ class MailMsg:
         ):
             self.message = self.attach_alternative(self.message)
 
-        self.message["Date"] = formatdate(time.time(), localtime=True)
-        self.message["Message-ID"] = self.msgId
-        self.message["To"] = ", ".join(str(recipient) for recipient in self.recipients)
-        self.message["From"] = sender
+        if self.attachments:
+            await self.attach_file(self.message, self.attachments)
+
+        return self.message
+
+    def _add_headers(self, message: Message, sender: str) -> None:
+        """
+        Adds the headers that set one message apart from the others
+        """
+        message["Date"] = formatdate(time.time(), localtime=True)
+        message["Message-ID"] = self.msgId
+        message["To"] = ", ".join(str(recipient) for recipient in self.recipients)
+        message["From"] = sender
 
         if self.subject:
-            self.message["Subject"] = self.subject
+            message["Subject"] = self.subject
 
         if self.cc:
-            self.message["Cc"] = ", ".join(str(recipient) for recipient in self.cc)
+            message["Cc"] = ", ".join(str(recipient) for recipient in self.cc)
 
         if self.bcc:
-            self.message["Bcc"] = ", ".join(str(recipient) for recipient in self.bcc)
+            message["Bcc"] = ", ".join(str(recipient) for recipient in self.bcc)
 
         if self.reply_to:
-            self.message["Reply-To"] = ", ".join(
+            message["Reply-To"] = ", ".join(
                 str(recipient) for recipient in self.reply_to
             )
 
-        if self.attachments:
-            await self.attach_file(self.message, self.attachments)
-
         if self.headers:
             for header_name, header_content in self.headers.items():
-                self.message.add_header(header_name, header_content)
+                message.add_header(header_name, header_content)
 
-        return self.message
+    async def _message(self, sender: str) -> Union[EmailMessage, Message]:
+        """
+        Creates the email message
+        """
+        message = await self._body()
+        self._add_headers(message, sender)
+        return message
+
+    def _prototype_key(self) -> Hashable:
+        """
+        Messages with equal keys have the same body and attachments
+        """
+        return (
+            self.subtype,
+            self.multipart_subtype,
+            self.charset,
+            repr(self.template_body or self.body),
+            self.alternative_body,
+            tuple((id(file), repr(file_meta)) for file, file_meta in self.attachments),
+        )
+
+    async def _prototype(self) -> "MailPrototype":
+        return MailPrototype(await self._body())
+
+    def _envelope(self) -> List[str]:
+        """
+        Envelope recipients, Bcc included, taken from the schema instead of
+        parsed back out of the headers
+        """
+        return [
+            recipient.email for recipient in (*self.recipients, *self.cc, *self.bcc)
+        ]
+
+    def _from_prototype(self, prototype: "MailPrototype", sender: str) -> Message:
+        """
+        Creates the email message around the body of a prototype
+        """
+        message = PrototypeMessage(prototype)
+        self._add_headers(message, sender)
+        return message
+
+
+class MailBatch:
+    """
+    State shared by the messages prepared in one send call
+
+    :param: prototypes: Build messages with the same body from a MailPrototype
+    :param: cache: AttachmentCache of encoded payloads shared across calls
+    :param: stream_threshold: Size in bytes from which attachments are
+    encoded while they are sent instead of in memory
+    :param: msgid_domain: Domain of generated Message-ID headers
+    """
+
+    def __init__(
+        self,
+        prototypes: bool = False,
+        cache: Optional[AttachmentCache] = None,
+        stream_threshold: Optional[int] = None,
+        msgid_domain: Optional[str] = None,
+    ) -> None:
+        self.cache = cache
+        self.stream_threshold = stream_threshold
+        self.msgid_domain = msgid_domain
+        # Encoded attachment parts by file identity and by content hash
+        self.parts: Dict[Hashable, Tuple[Any, MIMEBase]] = {}
+        self.prototypes: Optional[Dict[Hashable, MailPrototype]] = (
+            {} if prototypes else None
+        )
+
+    def streams(self, size: Optional[int]) -> bool:
+        """
+        Whether an attachment of ``size`` bytes is streamed, unknown sizes are not
+        """
+        return (
+            self.stream_threshold is not None
+            and size is not None
+            and size >= self.stream_threshold
+        )
+
+
+class MailPrototype:
+    """
+    Body and attachments shared by messages that only differ in their headers
+
+    The MIME tree is serialized once; every message built from the prototype
+    reuses the bytes and only serializes its own headers.
+
+    :param: message: MIME tree of the shared body, without per-message headers
+    """
+
+    policy = SMTP_POLICY
+
+    def __init__(self, message: MIMEMultipart) -> None:
+        self.message = message
+        with BytesIO() as buffer:
+            # Flattening the prototype itself fixes the boundaries in its
+            # headers, so the messages sharing its parts agree with the bytes
+            BytesGenerator(buffer, policy=self.policy).flatten(message)
+            data = buffer.getvalue()
+        self.body = data.split(b"\r\n\r\n", 1)[1]
+
+
+class PrototypeMessage(Message):
+    """
+    Message sharing the parts and serialized body of a MailPrototype
+    """
+
+    def __init__(self, prototype: MailPrototype) -> None:
+        super().__init__()
+        self.prototype = prototype
+        source: Message = prototype.message
+        for name, value in source.items():
+            self[name] = value
+        # The list of parts itself is shared, not copied. With the headers in
+        # place, setting the charset leaves them as they are
+        self.set_payload(source.get_payload(), source.get_charset())
+        self.preamble = source.preamble
+        self.epilogue = source.epilogue
+
+    def as_smtp_bytes(self) -> bytes:
+        """
+        Serializes the headers, leaving out Bcc, in front of the shared body
+        """
+        policy = self.prototype.policy
+        headers = b"".join(
+            policy.fold_binary(name, value)
+            for name, value in self.items()
+            if name.lower() not in ("bcc", "resent-bcc")
+        )
+        return headers + b"\r\n" + self.prototype.body
+
+
+def serialize(message: Union[EmailMessage, Message]) -> bytes:
+    """
+    Serializes a message for DATA, leaving out its Bcc headers
+    """
+    if isinstance(message, PrototypeMessage):
+        return message.as_smtp_bytes()
+    # A shallow copy, the parts are not copied. Deleting a header gives the
+    # copy a new header list, the message keeps its Bcc
+    message = copy.copy(message)
+    del message["Bcc"]
+    del message["Resent-Bcc"]
+    with BytesIO() as buffer:
+        BytesGenerator(buffer, policy=SMTP_POLICY).flatten(message)
+        return buffer.getvalue()
+
+
+def message_size(data: Union[bytes, MessageStream]) -> int:
+    """
+    Bytes the message takes in DATA with CRLF line endings, as counted by
+    the SIZE extension
+    """
+    if isinstance(data, MessageStream):
+        return data.size
+    # Bare LFs are sent as CRLF, counting is much cheaper than converting
+    return len(data) + data.count(b"\n") - data.count(b"\r\n")
+
+
+class PreparedMessage:
+    """
+    A message ready to send, with its envelope
+
+    The message is serialized on first use and the bytes are kept, so
+    retries and the spool send exactly what the first attempt did.
+
+    :param: message: The built email message
+    :param: sender: Envelope sender address
+    :param: recipients: Envelope recipient addresses, Bcc included
+    :param: data: The serialized message when already known, e.g. from the spool
+    """
+
+    def __init__(
+        self,
+        message: Union[EmailMessage, Message],
+        sender: str,
+        recipients: List[str],
+        data: Optional[bytes] = None,
+    ) -> None:
+        self.message = message
+        self.sender = sender
+        self.recipients = recipients
+        self._data = data
+        # Recipients already handled by the envelopes of a chunked send and
+        # the ones refused among them, so a retry carries on where it stopped
+        self.handled = 0
+        self.refused: Dict[str, SMTPResponse] = {}
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = serialize(self.message)
+        return self._data
+
+    @property
+    def payload(self) -> Union[bytes, MessageStream]:
+        """
+        What is written to DATA, a MessageStream when parts are streamed
+        """
+        return MessageStream.split(self.data, self.message) or self.data
+
+    @property
+    def serialized(self) -> bool:
+        return self._data is not None
+
+    @property
+    def size(self) -> int:
+        """
+        Bytes of the message in DATA, checked against the server's SIZE limit
+        """
+        return message_size(self.payload)
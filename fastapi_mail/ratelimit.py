@@ -0,0 +1,135 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from fastapi_mail.config import ConnectionConfig
+
+
+class TokenBucket:
+    """
+    Token bucket that makes callers wait for tokens instead of failing
+
+    :param: rate: Tokens added per second
+    :param: capacity: Most tokens the bucket holds, i.e. the largest burst
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("Token bucket rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.throttled = 0.0
+        self.waiting = 0
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def level(self) -> float:
+        """
+        Fill level between 0 (empty or in debt) and 1 (full)
+        """
+        self._refill()
+        return max(self.tokens, 0) / self.capacity
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """
+        Takes tokens from the bucket, waiting until enough have accumulated
+
+        A request larger than the capacity waits for a full bucket and leaves
+        it in debt, so it delays later callers instead of blocking forever.
+        Returns the seconds spent waiting.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            # The lock queues waiters so tokens are handed out first come first served
+            async with self._lock:
+                self._refill()
+                needed = min(tokens, self.capacity)
+                while self.tokens < needed:
+                    await asyncio.sleep((needed - self.tokens) / self.rate)
+                    self._refill()
+                self.tokens -= tokens
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.throttled += waited
+        return waited
+
+    def status(self) -> Dict[str, float]:
+        return {
+            "level": self.level,
+            "tokens": self.tokens,
+            "capacity": self.capacity,
+            "rate": self.rate,
+            "waiting": self.waiting,
+            "throttled": self.throttled,
+        }
+
+
+class RateLimiter:
+    """
+    Keeps sends within the message and recipient quotas of an SMTP relay
+
+    :param: messages: Bucket charged one token per message
+    :param: recipients: Bucket charged one token per envelope recipient
+    """
+
+    def __init__(
+        self,
+        messages: Optional[TokenBucket] = None,
+        recipients: Optional[TokenBucket] = None,
+    ) -> None:
+        self.messages = messages
+        self.recipients = recipients
+
+    @classmethod
+    def from_config(cls, config: ConnectionConfig) -> "RateLimiter":
+        messages = recipients = None
+        if config.RATE_LIMIT_MESSAGES_PER_SECOND:
+            rate = config.RATE_LIMIT_MESSAGES_PER_SECOND
+            messages = TokenBucket(
+                rate, config.RATE_LIMIT_MESSAGES_BURST or max(rate, 1)
+            )
+        if config.RATE_LIMIT_RECIPIENTS_PER_MINUTE:
+            rate = config.RATE_LIMIT_RECIPIENTS_PER_MINUTE
+            recipients = TokenBucket(
+                rate / 60, config.RATE_LIMIT_RECIPIENTS_BURST or max(rate, 1)
+            )
+        return cls(messages, recipients)
+
+    @property
+    def enabled(self) -> bool:
+        return self.messages is not None or self.recipients is not None
+
+    async def acquire(self, recipients: int) -> float:
+        """
+        Waits until a message to the given number of recipients may be sent
+        """
+        waited = 0.0
+        if self.messages is not None:
+            waited += await self.messages.acquire()
+        if self.recipients is not None:
+            waited += await self.recipients.acquire(recipients)
+        return waited
+
+    def status(self) -> Dict[str, Optional[Dict[str, float]]]:
+        """
+        Current state of both buckets, ``None`` for a quota that is not set
+        """
+        return {
+            "messages": self.messages.status() if self.messages else None,
+            "recipients": self.recipients.status() if self.recipients else None,
+        }
@@ -0,0 +1,218 @@
+import asyncio
+from enum import Enum
+from typing import Any, Collection, Dict, List, Optional, Sequence, Set
+
+from fastapi_mail.breaker import CircuitBreaker
+from fastapi_mail.config import ConnectionConfig
+from fastapi_mail.connection import Connection, ConnectionPool
+from fastapi_mail.errors import (
+    CircuitBreakerOpen,
+    ConnectionErrors,
+    PydanticClassRequired,
+)
+from fastapi_mail.ratelimit import RateLimiter
+
+
+class BalanceStrategy(Enum):
+    weighted_round_robin = "weighted_round_robin"
+    least_outstanding = "least_outstanding"
+
+
+class Relay:
+    """
+    An SMTP relay messages can be sent through
+
+    :param: config: ConnectionConfig of the relay
+    :param: weight: Share of the traffic the relay gets relative to the others
+    """
+
+    def __init__(self, config: ConnectionConfig, weight: int = 1) -> None:
+        if not isinstance(config, ConnectionConfig):
+            raise PydanticClassRequired(
+                "Configuration should be provided from ConnectionConfig class"
+            )
+        if weight <= 0:
+            raise ValueError("Relay weight must be positive")
+        self.config = config
+        self.weight = weight
+        self.breaker = CircuitBreaker.from_config(config)
+        self.rate_limiter = RateLimiter.from_config(config)
+        self.pool: Optional[ConnectionPool] = (
+            ConnectionPool(config, self.breaker) if config.USE_CONNECTION_POOL else None
+        )
+        self.healthy = True
+        self.failures = 0
+        self.outstanding = 0
+        self.current_weight = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.config.MAIL_SERVER}:{self.config.MAIL_PORT}"
+
+    @property
+    def load(self) -> float:
+        return self.outstanding / self.weight
+
+    async def acquire(self) -> Connection:
+        """
+        Opens a session to the relay, or takes one from its pool
+        """
+        if self.pool is not None:
+            connection = await self.pool.acquire()
+        else:
+            connection = Connection(self.config, self.breaker)
+            await connection._configure_connection()
+        connection.relay = self
+        self.outstanding += 1
+        return connection
+
+    async def release(self, connection: Connection, discard: bool = False) -> None:
+        self.outstanding -= 1
+        if self.pool is not None:
+            await self.pool.release(connection, discard=discard)
+        else:
+            await connection.close()
+
+    def is_exhausted(self, connection: Connection) -> bool:
+        return self.pool is not None and self.pool.is_exhausted(connection)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "relay": self.name,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "failures": self.failures,
+            "outstanding": self.outstanding,
+            "circuit": self.breaker.status() if self.breaker else None,
+            "rate_limit": (
+                self.rate_limiter.status() if self.rate_limiter.enabled else None
+            ),
+        }
+
+
+class RelayGroup:
+    """
+    Spreads sessions over several relays and fails over between them
+
+    A relay that fails ``max_failures`` times in a row, on connect or by
+    dropping the session, is taken out of rotation and probed in the
+    background every ``probe_interval`` seconds until a connection succeeds.
+    When every relay is out of rotation they are all tried anyway. A single
+    relay has nothing to fail over to, so it is never taken out of rotation
+    or probed: sends keep trying it, and keep failing, as they would alone.
+
+    :param: relays: Relays, or plain ConnectionConfigs with a weight of 1
+    :param: strategy: BalanceStrategy that picks the relay of a new session
+    :param: max_failures: Consecutive failures that take a relay out of rotation
+    :param: probe_interval: Seconds between recovery probes of an unhealthy relay
+    """
+
+    def __init__(
+        self,
+        relays: Sequence[Any],
+        strategy: BalanceStrategy = BalanceStrategy.weighted_round_robin,
+        max_failures: int = 3,
+        probe_interval: float = 30,
+    ) -> None:
+        if not relays:
+            raise ValueError("At least one relay is required")
+        self.relays: List[Relay] = [
+            relay if isinstance(relay, Relay) else Relay(relay) for relay in relays
+        ]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.probe_interval = probe_interval
+        self._probes: Set["asyncio.Task[None]"] = set()
+
+    def _pick(self, relays: List[Relay]) -> Relay:
+        if self.strategy == BalanceStrategy.least_outstanding:
+            return min(relays, key=lambda relay: relay.load)
+
+        # Smooth weighted round robin: interleaves relays instead of sending
+        # ``weight`` sessions in a row to the heaviest one
+        total = sum(relay.weight for relay in relays)
+        for relay in relays:
+            relay.current_weight += relay.weight
+        chosen = max(relays, key=lambda relay: relay.current_weight)
+        chosen.current_weight -= total
+        return chosen
+
+    def candidates(self) -> List[Relay]:
+        """
+        Relays in the order a new session tries them
+        """
+        healthy = [relay for relay in self.relays if relay.healthy]
+        if not healthy:
+            return sorted(self.relays, key=lambda relay: relay.failures)
+        chosen = self._pick(healthy)
+        rest = sorted(
+            (relay for relay in healthy if relay is not chosen),
+            key=lambda relay: relay.load,
+        )
+        return [chosen, *rest]
+
+    async def acquire(self, exclude: Collection[Relay] = ()) -> Connection:
+        """
+        Opens a session on the chosen relay, failing over to the next on error
+
+        :param: exclude: Relays not to use, e.g. ones a message is too large for
+        """
+        error: Optional[ConnectionErrors] = None
+        for relay in self.candidates():
+            if relay in exclude:
+                continue
+            try:
+                return await relay.acquire()
+            except CircuitBreakerOpen as relay_error:
+                # Already known to be down, not a new failure
+                error = relay_error
+            except ConnectionErrors as relay_error:
+                self.record_failure(relay)
+                error = relay_error
+        if error is None:
+            raise ConnectionErrors("No relay left to send through")
+        raise error
+
+    async def release(self, connection: Connection, discard: bool = False) -> None:
+        assert connection.relay is not None
+        await connection.relay.release(connection, discard=discard)
+
+    def record_success(self, relay: Relay) -> None:
+        relay.failures = 0
+
+    def record_failure(self, relay: Relay) -> None:
+        relay.failures += 1
+        if (
+            len(self.relays) > 1
+            and relay.healthy
+            and relay.failures >= self.max_failures
+        ):
+            relay.healthy = False
+            probe = asyncio.ensure_future(self._probe(relay))
+            self._probes.add(probe)
+            probe.add_done_callback(self._probes.discard)
+
+    async def _probe(self, relay: Relay) -> None:
+        while not relay.healthy:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                async with Connection(relay.config, relay.breaker):
+                    pass
+            except ConnectionErrors:
+                continue
+            relay.failures = 0
+            relay.healthy = True
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [relay.status() for relay in self.relays]
+
+    async def aclose(self) -> None:
+        """
+        Stops the recovery probes and closes pooled connections of every relay
+        """
+        for probe in list(self._probes):
+            probe.cancel()
+        await asyncio.gather(*self._probes, return_exceptions=True)
+        for relay in self.relays:
+            if relay.pool is not None:
+                await relay.pool.aclose()
@@ -0,0 +1,97 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+from fastapi_mail.config import ConnectionConfig
+from fastapi_mail.schemas import RenderMode
+
+EnvironmentKey = Tuple[str, int, bool, Optional[str]]
+
+# Environments of a render process, built on first use and kept for its lifetime
+_process_environments: Dict[EnvironmentKey, Environment] = {}
+
+
+def _render_in_process(
+    key: EnvironmentKey, template_name: str, context: Dict[str, Any]
+) -> str:
+    env = _process_environments.get(key)
+    if env is None:
+        folder, cache_size, auto_reload, bytecode_cache_dir = key
+        env = Environment(
+            loader=FileSystemLoader(folder),
+            cache_size=cache_size,
+            auto_reload=auto_reload,
+            bytecode_cache=(
+                FileSystemBytecodeCache(bytecode_cache_dir)
+                if bytecode_cache_dir
+                else None
+            ),
+        )
+        _process_environments[key] = env
+    return env.get_template(template_name).render(context)
+
+
+class TemplateRenderer:
+    """
+    Renders templates the way ``TEMPLATE_RENDER_MODE`` asks for
+
+    ``sync`` renders on the event loop, ``jinja_async`` uses Jinja's async
+    rendering, ``thread`` and ``process`` hand rendering to a pool of
+    ``TEMPLATE_RENDER_WORKERS`` threads or processes so heavy templates do not
+    block other requests. In ``process`` mode the template is loaded again by
+    name in the worker, so the context must be picklable.
+
+    :param: config: ConnectionConfig with the template settings
+    """
+
+    def __init__(self, config: ConnectionConfig) -> None:
+        self.config = config
+        self.mode = config.TEMPLATE_RENDER_MODE
+        self._executor: Optional[Executor] = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            workers = self.config.TEMPLATE_RENDER_WORKERS
+            if self.mode == RenderMode.process:
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="fastapi-mail-render"
+                )
+        return self._executor
+
+    def _environment_key(self) -> EnvironmentKey:
+        bytecode_cache_dir = self.config.TEMPLATE_BYTECODE_CACHE_DIR
+        return (
+            str(self.config.TEMPLATE_FOLDER),
+            self.config.TEMPLATE_CACHE_SIZE,
+            self.config.TEMPLATE_AUTO_RELOAD,
+            str(bytecode_cache_dir) if bytecode_cache_dir else None,
+        )
+
+    async def render(self, template: Template, context: Dict[str, Any]) -> str:
+        if self.mode == RenderMode.jinja_async:
+            return await template.render_async(context)
+        if self.mode == RenderMode.sync:
+            return template.render(context)
+
+        loop = asyncio.get_running_loop()
+        if self.mode == RenderMode.process and template.name is not None:
+            return await loop.run_in_executor(
+                self._pool(),
+                _render_in_process,
+                self._environment_key(),
+                template.name,
+                context,
+            )
+        return await loop.run_in_executor(self._pool(), template.render, context)
+
+    def close(self) -> None:
+        """
+        Shuts the worker pool down, waiting for running renders
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,75 @@
+import asyncio
+import random
+from typing import Optional
+
+from aiosmtplib import SMTPRecipientsRefused, SMTPResponseException, SMTPTimeoutError
+from pydantic import BaseModel, confloat, conint
+
+from fastapi_mail.errors import ConnectionErrors
+
+
+class RetryPolicy(BaseModel):
+    """
+    Decides whether and when a failed message is sent again
+
+    Temporary 4xx replies, dropped connections and timeouts are retried with
+    exponential backoff; permanent 5xx replies fail straight away.
+
+    :param: max_attempts: Attempts per message, including the first one
+    :param: base_delay: Seconds to wait before the first retry
+    :param: max_delay: Upper bound of a single wait in seconds
+    :param: multiplier: Factor the wait grows by after every attempt
+    :param: jitter: Wait a random time between zero and the backoff instead
+    of the backoff itself, so retries from parallel senders spread out
+    :param: deadline: Seconds after the first attempt of a message past which
+    it is no longer retried, ``None`` for no limit
+    """
+
+    max_attempts: conint(gt=0) = 3  # type: ignore
+    base_delay: confloat(ge=0) = 1.0  # type: ignore
+    max_delay: confloat(ge=0) = 30.0  # type: ignore
+    multiplier: confloat(ge=1) = 2.0  # type: ignore
+    jitter: bool = True
+    deadline: Optional[confloat(gt=0)] = None  # type: ignore
+
+    @staticmethod
+    def is_transient(error: BaseException) -> bool:
+        """
+        Whether the error is worth another attempt
+        """
+        if isinstance(error, ConnectionErrors):
+            if error.__cause__ is None:
+                return False
+            error = error.__cause__
+
+        if isinstance(error, SMTPRecipientsRefused):
+            return bool(error.recipients) and all(
+                400 <= refused.code < 500 for refused in error.recipients
+            )
+        if isinstance(error, SMTPResponseException):
+            return 400 <= error.code < 500
+        # Dropped connections, refused connects and timeouts. Before Python
+        # 3.11 asyncio.TimeoutError is not an OSError
+        return isinstance(error, (OSError, SMTPTimeoutError, asyncio.TimeoutError))
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Seconds to wait after the given failed attempt, counting from 1
+        """
+        delay = min(self.base_delay * self.multiplier ** (attempt - 1), self.max_delay)
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    def next_delay(
+        self, error: BaseException, attempt: int, elapsed: float
+    ) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt, ``None`` when giving up
+        """
+        if attempt >= self.max_attempts or not self.is_transient(error):
+            return None
+        delay = self.backoff(attempt)
+        if self.deadline is not None and elapsed + delay > self.deadline:
+            return None
+        return delay
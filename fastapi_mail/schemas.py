@@ -1,8 +1,7 @@
 import os
 from enum import Enum
-from io import BytesIO
 from mimetypes import MimeTypes
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from pydantic import (
     BaseModel,
@@ -14,9 +13,17 @@ from pydantic import (
 )
 from starlette.datastructures import Headers, UploadFile
 
+from fastapi_mail.attachments import FileAttachment
 from fastapi_mail.errors import WrongFile
 
 
+class RenderMode(Enum):
+    sync = "sync"
+    jinja_async = "jinja_async"
+    thread = "thread"
+    process = "process"
+
+
 class MultipartSubtypeEnum(Enum):
     """
     For more info about Multipart subtypes, visit:
@@ -73,18 +80,12 @@ class MessageSchema(BaseModel):
                 file = file["file"]
             if isinstance(file, str):
                 if os.path.isfile(file) and os.access(file, os.R_OK):
-                    mime_type = mime.guess_type(file)
-                    with open(file, mode="rb") as f:
-                        _, file_name = os.path.split(f.name)
-                        content_type = mime_type[0]
-                        headers = None
-                        if content_type:
-                            headers = Headers({"content-type": content_type})
-                        file_content = BytesIO(f.read())
-                        u = UploadFile(
-                            filename=file_name, file=file_content, headers=headers
-                        )
-                        temp.append((u, file_meta))
+                    content_type = mime.guess_type(file)[0]
+                    headers = None
+                    if content_type:
+                        headers = Headers({"content-type": content_type})
+                    # Read when the message is built, not when it is validated
+                    temp.append((FileAttachment(file, headers=headers), file_meta))
                 else:
                     raise WrongFile(
                         "incorrect file path for attachment or not readable"
@@ -110,3 +111,92 @@ class MessageSchema(BaseModel):
         return self
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def prevalidated(cls, **data: Any) -> "MessageSchema":
+        """
+        Builds a message without running validation, for bulk sends of data
+        that was already validated or normalized
+
+        Addresses may be ``NameEmail`` or plain, already normalized address
+        strings; they are not parsed again. ``attachments`` must hold the
+        ``(file, meta)`` pairs of an already validated message, and
+        ``subtype`` a ``MessageType``. Nothing is checked: invalid data fails
+        when the message is built or sent.
+        """
+        for field in ("recipients", "cc", "bcc", "reply_to"):
+            if field in data:
+                data[field] = [
+                    (
+                        address
+                        if isinstance(address, NameEmail)
+                        # The name validation would derive from the address
+                        else NameEmail(address.split("@", 1)[0], address)
+                    )
+                    for address in data[field]
+                ]
+        if data.get("multipart_subtype") != MultipartSubtypeEnum.alternative:
+            data.pop("alternative_body", None)
+        return cls.model_construct(**data)
+
+
+class Personalization(BaseModel):
+    """
+    What sets one message of a mail merge apart from the others
+
+    :param: recipient: Address the message is sent to
+    :param: template_body: Data for the template, replaces the shared one
+    :param: subject: Subject of the message, replaces the shared one
+    """
+
+    recipient: NameEmail
+    template_body: Optional[Union[list, dict, str]] = None
+    subject: Optional[str] = None
+
+
+class SendResult(BaseModel):
+    """
+    Outcome of sending a single message from a bulk send
+
+    :param: message_id: Message-ID header of the message
+    :param: accepted: Envelope recipients the server accepted
+    :param: refused: Refused recipients mapped to the SMTP code and reply
+    :param: code: SMTP code of the final reply, ``None`` when nothing was sent
+    :param: response: Text of the final server reply
+    :param: size: Bytes of the message as sent in DATA
+    :param: elapsed: Seconds spent sending the message, retries included
+    :param: attempts: Number of times sending was attempted
+    :param: error: Description of the failure, ``None`` on success
+    """
+
+    message_id: Optional[str] = None
+    accepted: List[str] = []
+    refused: Dict[str, Tuple[int, str]] = {}
+    code: Optional[int] = None
+    response: Optional[str] = None
+    size: Optional[int] = None
+    elapsed: float = 0.0
+    attempts: int = 1
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+class TemplateWarmup(BaseModel):
+    """
+    Outcome of compiling templates ahead of the first send
+
+    :param: compiled: Names of the templates that compiled
+    :param: failed: Templates that did not compile mapped to the error
+    :param: elapsed: Seconds spent loading and compiling
+    """
+
+    compiled: List[str] = []
+    failed: Dict[str, str] = {}
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return not self.failed
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from fastapi_mail.errors import SendQueueClosed, SendQueueFull
+from fastapi_mail.schemas import SendResult
+
+Send = Callable[[], Awaitable[List[SendResult]]]
+QueueItem = Tuple[Send, int, "asyncio.Future[List[SendResult]]"]
+
+
+class SendQueue:
+    """
+    In-process queue drained by background worker tasks
+
+    :param: max_size: Most queued entries before ``put`` waits or fails
+    :param: workers: Number of worker tasks draining the queue
+    """
+
+    def __init__(self, max_size: int, workers: int) -> None:
+        self.max_size = max_size
+        self.worker_count = workers
+        self._queue: "asyncio.Queue[QueueItem]" = asyncio.Queue(maxsize=max_size)
+        self._workers: List["asyncio.Task[None]"] = []
+        self._closed = False
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def full(self) -> bool:
+        return self._queue.full()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.size,
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "workers": len(self._workers),
+        }
+
+    def _start(self) -> None:
+        # Workers are started on first use so the queue can be created outside a loop
+        if not self._workers:
+            self._workers = [
+                asyncio.ensure_future(self._work()) for _ in range(self.worker_count)
+            ]
+
+    async def put(
+        self, send: Send, count: int, wait: bool = True
+    ) -> "asyncio.Future[List[SendResult]]":
+        """
+        Queues a send of ``count`` messages and returns a future resolved with
+        their results
+
+        When the queue is full, waits for room or, with ``wait=False``, raises
+        ``SendQueueFull``.
+        """
+        if self._closed:
+            raise SendQueueClosed("Send queue is closed")
+
+        self._start()
+        future: "asyncio.Future[List[SendResult]]" = (
+            asyncio.get_running_loop().create_future()
+        )
+        if wait:
+            await self._queue.put((send, count, future))
+        else:
+            try:
+                self._queue.put_nowait((send, count, future))
+            except asyncio.QueueFull:
+                raise SendQueueFull(f"Send queue is full ({self.max_size} entries)")
+        return future
+
+    async def _work(self) -> None:
+        while True:
+            send, count, future = await self._queue.get()
+            self.in_flight += 1
+            try:
+                results = await send()
+            except Exception as error:
+                # Preparing the messages failed, e.g. a missing template
+                results = [SendResult(error=str(error)) for _ in range(count)]
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+
+            for result in results:
+                if result.success:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+            if not future.done():
+                future.set_result(results)
+
+    async def drain(self) -> None:
+        """
+        Waits until every queued message has been sent or has failed
+        """
+        await self._queue.join()
+
+    async def aclose(self) -> None:
+        """
+        Stops accepting messages, drains the queue and stops the workers
+        """
+        self._closed = True
+        if self._workers:
+            await self.drain()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import sqlite3
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from pydantic import BaseModel
+
+
+class SpoolStatus(Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    data BLOB NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status);
+"""
+
+
+class SpoolEntry(BaseModel):
+    """
+    A message stored in the outbox
+
+    :param: id: Row id in the outbox
+    :param: message_id: Message-ID header of the message
+    :param: sender: Envelope sender
+    :param: recipients: Envelope recipients, Bcc included
+    :param: data: The message serialized as RFC 5322 bytes
+    :param: status: SpoolStatus of the entry
+    :param: attempts: Number of times sending was attempted
+    :param: error: Why the message failed
+    """
+
+    id: int
+    message_id: Optional[str] = None
+    sender: str
+    recipients: List[str]
+    data: bytes
+    status: SpoolStatus = SpoolStatus.pending
+    attempts: int = 0
+    error: Optional[str] = None
+
+
+Operation = Callable[[sqlite3.Connection], Any]
+
+
+class Spool:
+    """
+    SQLite outbox that keeps queued mail across restarts
+
+    Writes are group committed: operations submitted within
+    ``commit_interval`` seconds of each other share one transaction and one
+    fsync, so concurrent senders do not each pay for a disk flush.
+
+    :param: path: SQLite database file, created when missing
+    :param: commit_interval: Seconds writes are collected before committing
+    """
+
+    def __init__(self, path: Union[str, Path], commit_interval: float = 0.005) -> None:
+        self.path = Path(path)
+        self.commit_interval = commit_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._operations: List[Tuple[Operation, "asyncio.Future[Any]"]] = []
+        self._flusher: Optional["asyncio.Task[None]"] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=FULL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def _apply(self, operations: List[Operation]) -> List[Any]:
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            results = [operation(db) for operation in operations]
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return results
+
+    def _submit(self, operation: Operation) -> "asyncio.Future[Any]":
+        future = asyncio.get_running_loop().create_future()
+        self._operations.append((operation, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush())
+        return future
+
+    async def _flush(self) -> None:
+        while self._operations:
+            await asyncio.sleep(self.commit_interval)
+            batch, self._operations = self._operations, []
+            try:
+                results = await asyncio.to_thread(
+                    self._apply, [operation for operation, _ in batch]
+                )
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def add(
+        self, entries: Sequence[Tuple[Optional[str], str, Sequence[str], bytes]]
+    ) -> List[int]:
+        """
+        Stores ``(message_id, sender, recipients, data)`` entries as pending
+
+        Returns the ids of the new rows in the order of ``entries``.
+        """
+
+        def insert(db: sqlite3.Connection) -> List[int]:
+            now = time.time()
+            ids = []
+            for message_id, sender, recipients, data in entries:
+                cursor = db.execute(
+                    "INSERT INTO outbox (message_id, sender, recipients, data,"
+                    " status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        message_id,
+                        sender,
+                        json.dumps(list(recipients)),
+                        data,
+                        SpoolStatus.pending.value,
+                        now,
+                        now,
+                    ),
+                )
+                # Always set after an INSERT into a rowid table
+                assert cursor.lastrowid is not None
+                ids.append(cursor.lastrowid)
+            return ids
+
+        return await self._submit(insert)
+
+    def mark(
+        self,
+        entry_id: int,
+        status: SpoolStatus,
+        attempts: int = 1,
+        error: Optional[str] = None,
+    ) -> "asyncio.Future[None]":
+        """
+        Records the outcome of an entry
+
+        Returns a future that resolves once the change is committed, so a
+        sender can carry on and await the commits of a whole batch at once.
+        """
+
+        def update(db: sqlite3.Connection) -> None:
+            db.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + ?, error = ?,"
+                " updated = ? WHERE id = ?",
+                (status.value, attempts, error, time.time(), entry_id),
+            )
+
+        return self._submit(update)
+
+    async def entries(
+        self, status: SpoolStatus = SpoolStatus.pending
+    ) -> List[SpoolEntry]:
+        """
+        Returns the entries with the given status, oldest first
+        """
+
+        def select(db: sqlite3.Connection) -> List[SpoolEntry]:
+            rows = db.execute(
+                "SELECT id, message_id, sender, recipients, data, status, attempts,"
+                " error FROM outbox WHERE status = ? ORDER BY id",
+                (status.value,),
+            )
+            return [
+                SpoolEntry(
+                    id=row[0],
+                    message_id=row[1],
+                    sender=row[2],
+                    recipients=json.loads(row[3]),
+                    data=row[4],
+                    status=SpoolStatus(row[5]),
+                    attempts=row[6],
+                    error=row[7],
+                )
+                for row in rows
+            ]
+
+        return await self._submit(select)
+
+    async def purge(self, older_than: float = 0) -> int:
+        """
+        Deletes sent entries last updated more than ``older_than`` seconds ago
+        """
+
+        def delete(db: sqlite3.Connection) -> int:
+            cursor = db.execute(
+                "DELETE FROM outbox WHERE status = ? AND updated <= ?",
+                (SpoolStatus.sent.value, time.time() - older_than),
+            )
+            return cursor.rowcount
+
+        return await self._submit(delete)
+
+    async def aclose(self) -> None:
+        """
+        Commits outstanding writes and closes the database
+        """
+        if self._flusher is not None:
+            await self._flusher
+        if self._db is not None:
+            self._db.close()
+            self._db = None
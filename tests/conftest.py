@@ -1,10 +1,19 @@
+import asyncio
 from pathlib import Path
 from typing import Generator
+from unittest.mock import patch
 
 import fakeredis.aioredis
 import pytest
 import pytest_asyncio
+from aiosmtplib import (
+    SMTPRecipientRefused,
+    SMTPRecipientsRefused,
+    SMTPResponse,
+    SMTPServerDisconnected,
+)
 
+from fastapi_mail import MessageSchema, MessageType
 from fastapi_mail.email_utils import DefaultChecker
 
 
@@ -47,3 +56,124 @@ def mail_config() -> Generator:
     }
 
     yield env
+
+
+class FakeSMTP:
+    """Stands in for ``aiosmtplib.SMTP`` and records what would be sent"""
+
+    def __init__(self, registry: "FakeSMTPRegistry", **kwargs) -> None:
+        self.registry = registry
+        self.kwargs = kwargs
+        self.sent: list = []
+        self.delay = registry.delays.pop(0) if registry.delays else 0
+        self.is_connected = False
+
+    async def connect(self) -> None:
+        if self.kwargs["hostname"] in self.registry.down:
+            raise ConnectionRefusedError(f"{self.kwargs['hostname']} is down")
+        self.is_connected = True
+
+    async def login(self, username: str, password: str) -> None:
+        pass
+
+    async def quit(self) -> None:
+        self.is_connected = False
+
+    def close(self) -> None:
+        self.is_connected = False
+
+    async def rset(self) -> SMTPResponse:
+        return SMTPResponse(250, "OK")
+
+    is_ehlo_or_helo_needed = False
+
+    @property
+    def esmtp_extensions(self) -> dict:
+        limit = self.registry.size_limits.get(self.kwargs["hostname"])
+        return {} if limit is None else {"size": str(limit)}
+
+    def supports_extension(self, extension: str) -> bool:
+        return extension.lower() in self.esmtp_extensions
+
+    async def sendmail(self, sender, recipients, message, **kwargs):
+        await asyncio.sleep(self.delay)
+        for address in recipients:
+            if address in self.registry.errors:
+                error = self.registry.errors.pop(address)
+                if isinstance(error, SMTPServerDisconnected):
+                    self.is_connected = False
+                raise error
+
+        refused = {
+            address: SMTPResponse(550, "User unknown")
+            for address in recipients
+            if address in self.registry.refused
+        }
+        if len(refused) == len(recipients):
+            raise SMTPRecipientsRefused(
+                [
+                    SMTPRecipientRefused(reply.code, reply.message, address)
+                    for address, reply in refused.items()
+                ]
+            )
+        self.sent.append((sender, recipients, message))
+        return refused, "OK"
+
+
+class FakeSMTPRegistry:
+    def __init__(self) -> None:
+        self.instances: list = []
+        # Per-message delay of each session, in the order they are opened
+        self.delays: list = []
+        # Recipients the server refuses with a 550
+        self.refused: set = set()
+        # Raised once by sendmail when a message is addressed to the key
+        self.errors: dict = {}
+        # Hostnames that refuse connections
+        self.down: set = set()
+        # SIZE limit each hostname advertises, none when missing
+        self.size_limits: dict = {}
+
+    def __call__(self, **kwargs) -> FakeSMTP:
+        session = FakeSMTP(self, **kwargs)
+        self.instances.append(session)
+        return session
+
+    @property
+    def sent(self) -> list:
+        return [message for session in self.instances for message in session.sent]
+
+    def sent_through(self, hostname: str) -> list:
+        return [
+            message
+            for session in self.instances
+            if session.kwargs["hostname"] == hostname
+            for message in session.sent
+        ]
+
+
+@pytest.fixture
+def make_message():
+    """Builds plain text messages to one recipient, fields override the defaults"""
+
+    def make(recipient="to@example.com", **fields):
+        fields.setdefault("recipients", [recipient])
+        return MessageSchema(
+            **{
+                "subject": "test",
+                "body": "test body",
+                "subtype": MessageType.plain,
+                **fields,
+            }
+        )
+
+    return make
+
+
+@pytest.fixture
+def fake_smtp(mail_config) -> Generator:
+    """Sends through an in-memory SMTP double instead of suppressing sends"""
+    mail_config["SUPPRESS_SEND"] = 0
+    registry = FakeSMTPRegistry()
+    with patch("fastapi_mail.connection.aiosmtplib.SMTP", registry):
+        yield registry
@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import io
+import os
+from email import message_from_bytes
+from email.encoders import encode_base64
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+from fastapi_mail.attachments import AttachmentCache, FileAttachment, MessageStream
+from fastapi_mail.connection import Connection
+from fastapi_mail.msg import MailBatch, MailMsg, PreparedMessage
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used():
+    cache = AttachmentCache(max_size=8)
+    await cache.put("a", "AAAA")
+    await cache.put("b", "BBBB")
+    assert await cache.get("a") == "AAAA"
+    await cache.put("c", "CCCC")
+
+    assert await cache.get("b") is None
+    assert await cache.get("c") == "CCCC"
+    assert cache.status() == {"entries": 2, "size": 8, "hits": 2, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_cache_disk_tier_outlives_instance(tmp_path):
+    cache = AttachmentCache(max_size=4, directory=tmp_path, directory_max_size=8)
+    await cache.put("a", "AAAA")
+    await cache.put("b", "BBBB")
+    os.utime(tmp_path / "a.b64", (0, 0))
+    await cache.put("c", "CCCC")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b.b64", "c.b64"]
+    restarted = AttachmentCache(max_size=4, directory=tmp_path)
+    assert await restarted.get("b") == "BBBB"
+    assert await restarted.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_attachment_encoded_once_across_sends(mail_config, fake_smtp):
+    conf = ConnectionConfig(**mail_config, ATTACHMENT_CACHE_SIZE=1 << 20)
+    fm = FastMail(conf)
+    content = b"%PDF-1.4 terms" * 100
+
+    with patch("fastapi_mail.msg.encode_base64", side_effect=encode_base64) as encode:
+        for recipient in ["a@example.com", "b@example.com"]:
+            attachment = UploadFile(filename="terms.pdf", file=BytesIO(content))
+            message = MessageSchema(
+                subject="Terms",
+                recipients=[recipient],
+                body="See attached",
+                subtype=MessageType.plain,
+                attachments=[attachment],
+            )
+            await fm.send_message(message)
+
+    assert encode.call_count == 1
+    assert await fm.attachment_cache.get(hashlib.sha256(content).hexdigest())
+    for _, _, data in fake_smtp.sent:
+        _, pdf = message_from_bytes(data).get_payload()
+        assert pdf.get_payload(decode=True) == content
+
+
+@pytest.mark.asyncio
+async def test_path_attachment_read_when_message_is_built(tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_bytes(b"draft")
+    schema = MessageSchema(
+        subject="Report",
+        recipients=["to@example.com"],
+        body="See attached",
+        subtype=MessageType.plain,
+        attachments=[str(path)],
+    )
+    path.write_bytes(b"final")
+
+    attachment, _ = schema.attachments[0]
+    assert isinstance(attachment, FileAttachment)
+    assert attachment.filename == "report.txt"
+    assert attachment.content_type == "text/plain"
+    message = await MailMsg(schema)._message("from@example.com")
+    assert message.get_payload()[1].get_payload(decode=True) == b"final"
+
+
+@pytest.mark.asyncio
+async def test_path_attachment_reads_like_an_upload(tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_bytes(b"0123456789")
+    attachment = FileAttachment(path)
+
+    chunks = []
+    while chunk := await attachment.read(4):
+        chunks.append(chunk)
+    assert chunks == [b"0123", b"4567", b"89"]
+
+    await attachment.seek(6)
+    assert await attachment.read() == b"6789"
+    await attachment.seek(0)
+    assert await attachment.read() == b"0123456789"
+    with pytest.raises(io.UnsupportedOperation):
+        await attachment.write(b"changed")
+
+
+@pytest.mark.asyncio
+async def test_cached_path_attachment_is_not_read_again(
+    mail_config, fake_smtp, tmp_path
+):
+    path = tmp_path / "brochure.pdf"
+    path.write_bytes(b"%PDF-1.4 brochure")
+    conf = ConnectionConfig(**mail_config, ATTACHMENT_CACHE_SIZE=1 << 20)
+    fm = FastMail(conf)
+
+    with patch.object(
+        FileAttachment, "_read", autospec=True, side_effect=FileAttachment._read
+    ) as read:
+        for recipient in ["a@example.com", "b@example.com"]:
+            message = MessageSchema(
+                subject="Brochure",
+                recipients=[recipient],
+                body="See attached",
+                subtype=MessageType.plain,
+                attachments=[str(path)],
+            )
+            await fm.send_message(message)
+
+    assert read.call_count == 1
+    for _, _, data in fake_smtp.sent:
+        _, pdf = message_from_bytes(data).get_payload()
+        assert pdf.get_payload(decode=True) == b"%PDF-1.4 brochure"
+
+
+@pytest.mark.asyncio
+async def test_path_attachment_is_not_cached_on_disk(mail_config, fake_smtp, tmp_path):
+    path = tmp_path / "brochure.pdf"
+    path.write_bytes(b"%PDF-1.4 brochure")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    conf = ConnectionConfig(
+        **mail_config, ATTACHMENT_CACHE_SIZE=1 << 20, ATTACHMENT_CACHE_DIR=cache_dir
+    )
+    fm = FastMail(conf)
+
+    message = MessageSchema(
+        subject="Brochure",
+        recipients=["to@example.com"],
+        body="See attached",
+        subtype=MessageType.plain,
+        attachments=[str(path)],
+    )
+    await fm.send_message(message)
+
+    assert fm.attachment_cache.status()["entries"] == 1
+    assert list(cache_dir.iterdir()) == []
+
+
+def streamed_schema(attachment):
+    return MessageSchema(
+        subject="Dataset",
+        recipients=["to@example.com"],
+        body=".starts with a dot",
+        subtype=MessageType.plain,
+        attachments=[attachment],
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_encodes_attachment_while_writing(tmp_path):
+    content = os.urandom(MessageStream.CHUNK_SIZE * 2 + 100)
+    path = tmp_path / "dataset.bin"
+    path.write_bytes(content)
+    message = await MailMsg(
+        streamed_schema(str(path)), MailBatch(stream_threshold=1024)
+    )._message("from@example.com")
+
+    stream = MessageStream.split(message.as_bytes(), message)
+    chunks = [chunk async for chunk in stream]
+    data = b"".join(chunks)
+
+    assert len(chunks) == 6
+    assert stream.size == len(data)
+    parsed = message_from_bytes(data)
+    _, attachment = parsed.get_payload()
+    assert attachment.get_payload(decode=True) == content
+    assert attachment.get_filename() == "dataset.bin"
+
+
+@pytest.mark.asyncio
+async def test_small_attachments_are_not_streamed():
+    attachment = UploadFile(filename="a.txt", file=BytesIO(b"small"), size=5)
+    message = await MailMsg(
+        streamed_schema(attachment), MailBatch(stream_threshold=1024)
+    )._message("from@example.com")
+
+    assert MessageStream.split(message.as_bytes(), message) is None
+
+
+class StreamingProtocol:
+    """Accepts a pipelined envelope and collects DATA until the final dot"""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.writes = 0
+
+    def data_received(self, data: bytes) -> None:
+        raise AssertionError("replies must not reach the aiosmtplib parser")
+
+    def connection_lost(self, exc) -> None:
+        pass
+
+    async def _drain_helper(self) -> None:
+        pass
+
+    def write(self, data: bytes) -> None:
+        if data.startswith(b"MAIL"):
+            replies = b"250 sender ok\r\n250 rcpt ok\r\n354 go ahead\r\n"
+        else:
+            self.writes += 1
+            self.data.extend(data)
+            if not self.data.endswith(b"\r\n.\r\n"):
+                return
+            replies = b"250 queued\r\n"
+        asyncio.get_running_loop().call_soon(self.data_received, replies)
+
+
+class StreamingSMTP:
+    is_connected = True
+    is_ehlo_or_helo_needed = False
+    esmtp_extensions = {"pipelining": "", "size": "0"}
+
+    def __init__(self, protocol: StreamingProtocol) -> None:
+        self.protocol = protocol
+
+    def supports_extension(self, extension: str) -> bool:
+        return extension.lower() in ("pipelining", "size")
+
+
+@pytest.mark.asyncio
+async def test_connection_streams_attachment_into_data(mail_config, tmp_path):
+    content = os.urandom(MessageStream.CHUNK_SIZE * 3)
+    path = tmp_path / "dataset.bin"
+    path.write_bytes(content)
+    message = await MailMsg(
+        streamed_schema(str(path)), MailBatch(stream_threshold=1024)
+    )._message("from@example.com")
+    connection = Connection(ConnectionConfig(**mail_config))
+    protocol = StreamingProtocol()
+    connection.session = StreamingSMTP(protocol)
+
+    prepared = PreparedMessage(message, "from@example.com", ["to@example.com"])
+    _, response = await connection.sendmail(
+        prepared.sender, prepared.recipients, prepared.payload
+    )
+
+    assert response == "queued"
+    assert protocol.writes == 6
+    _, attachment = message_from_bytes(bytes(protocol.data)).get_payload()
+    assert attachment.get_payload(decode=True) == content
+
+
+class StreamingServer(StreamingSMTP):
+    """StreamingSMTP that FastMail connects to, one protocol per session"""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(StreamingProtocol())
+
+    async def connect(self) -> None:
+        pass
+
+    async def quit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_shared_upload_streamed_by_concurrent_sessions(mail_config):
+    content = os.urandom(MessageStream.CHUNK_SIZE * 6)
+    attachment = UploadFile(filename="dataset.bin", file=BytesIO(content))
+    attachment.size = len(content)
+    mail_config["SUPPRESS_SEND"] = 0
+    conf = ConnectionConfig(
+        **mail_config, ATTACHMENT_STREAM_THRESHOLD=1024, SEND_CONCURRENCY=4
+    )
+    sessions: list = []
+
+    def connect(**kwargs) -> StreamingServer:
+        sessions.append(StreamingServer(**kwargs))
+        return sessions[-1]
+
+    with patch("fastapi_mail.connection.aiosmtplib.SMTP", connect):
+        results = await FastMail(conf).send_bulk(
+            [streamed_schema(attachment) for _ in range(4)]
+        )
+
+    assert all(result.success for result in results)
+    received = [bytes(session.protocol.data) for session in sessions]
+    assert len(received) == 4
+    for data in received:
+        _, part = message_from_bytes(data).get_payload()
+        assert part.get_payload(decode=True) == content
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from fastapi_mail import ConnectionConfig, FastMail
+from fastapi_mail.breaker import CircuitBreaker, CircuitState
+from fastapi_mail.errors import CircuitBreakerOpen, ConnectionErrors
+
+
+def test_breaker_lets_one_probe_through_after_cooldown():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.01)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.closed
+    breaker.record_failure()
+    assert breaker.state == CircuitState.open
+    with pytest.raises(CircuitBreakerOpen):
+        breaker.before_connect()
+
+    time.sleep(0.01)
+    assert breaker.state == CircuitState.half_open
+    breaker.before_connect()
+    with pytest.raises(CircuitBreakerOpen):
+        breaker.before_connect()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.open
+    time.sleep(0.01)
+    breaker.before_connect()
+    breaker.record_success()
+    assert breaker.state == CircuitState.closed
+    assert breaker.status()["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_rejects_without_connecting(
+    mail_config, fake_smtp, make_message
+):
+    fake_smtp.down.add("localhost")
+    conf = ConnectionConfig(
+        **mail_config, CIRCUIT_BREAKER_THRESHOLD=2, CIRCUIT_BREAKER_COOLDOWN=60
+    )
+    fm = FastMail(conf)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionErrors):
+            await fm.send_message(make_message())
+    assert len(fake_smtp.instances) == 2
+
+    with pytest.raises(CircuitBreakerOpen):
+        await fm.send_message(make_message())
+    assert len(fake_smtp.instances) == 2
+
+    (status,) = fm.relays.status()
+    assert status["circuit"]["state"] == "open"
+    assert status["circuit"]["retry_in"] > 0
+    await fm.aclose()
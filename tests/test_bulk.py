@@ -0,0 +1,242 @@
+from unittest.mock import patch
+
+import pytest
+from aiosmtplib import SMTPDataError, SMTPServerDisconnected
+
+from fastapi_mail import (
+    ConnectionConfig,
+    FastMail,
+    MessageSchema,
+    MessageType,
+    NameEmail,
+    RetryPolicy,
+)
+from fastapi_mail.connection import Connection
+from fastapi_mail.errors import ConnectionErrors
+from fastapi_mail.msg import MailMsg
+
+
+@pytest.fixture
+def make_messages(make_message):
+    def make(count):
+        return [
+            make_message(f"user{i}@example.com", subject=f"Bulk {i}")
+            for i in range(count)
+        ]
+
+    return make
+
+
+@pytest.mark.asyncio
+async def test_bulk_send_spreads_messages_over_sessions(
+    mail_config, fake_smtp, make_messages
+):
+    conf = ConnectionConfig(**mail_config, SEND_CONCURRENCY=3)
+    fm = FastMail(conf)
+
+    with fm.record_messages() as outbox:
+        await fm.send_message(make_messages(9))
+
+    assert len(fake_smtp.instances) == 3
+    assert len(fake_smtp.sent) == 9
+    assert [mail["Subject"] for mail in outbox] == [f"Bulk {i}" for i in range(9)]
+    assert not any(session.is_connected for session in fake_smtp.instances)
+
+
+@pytest.mark.asyncio
+async def test_bulk_send_slow_session_does_not_hold_up_others(
+    mail_config, fake_smtp, make_messages
+):
+    fake_smtp.delays = [0.05, 0]
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+
+    await fm.send_message(make_messages(10), concurrency=2)
+
+    slow, fast = fake_smtp.instances
+    assert len(slow.sent) == 1
+    assert len(fast.sent) == 9
+
+
+@pytest.mark.asyncio
+async def test_bulk_send_never_opens_more_sessions_than_messages(
+    mail_config, fake_smtp, make_messages
+):
+    conf = ConnectionConfig(**mail_config, SEND_CONCURRENCY=8)
+    fm = FastMail(conf)
+
+    await fm.send_message(make_messages(2))
+
+    assert len(fake_smtp.instances) == 2
+
+
+@pytest.mark.asyncio
+async def test_send_bulk_reports_each_message(mail_config, fake_smtp, make_messages):
+    fake_smtp.refused = {"user1@example.com"}
+    fake_smtp.errors = {"user2@example.com": SMTPDataError(552, "Message too big")}
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+    messages = make_messages(4)
+    messages[0].cc = [NameEmail("cc", "cc@example.com")]
+
+    with fm.record_messages() as outbox:
+        results = await fm.send_bulk(messages)
+
+    assert [result.success for result in results] == [True, False, False, True]
+    assert results[0].accepted == ["user0@example.com", "cc@example.com"]
+    assert results[0].code == 250
+    assert results[0].message_id == outbox[0]["Message-ID"]
+    assert results[1].refused == {"user1@example.com": (550, "User unknown")}
+    assert results[2].code == 552
+    assert results[2].response == "Message too big"
+    assert all(result.elapsed >= 0 for result in results)
+    assert len(outbox) == 2
+
+
+@pytest.mark.asyncio
+async def test_send_bulk_reconnects_after_dropped_connection(
+    mail_config, fake_smtp, make_messages
+):
+    fake_smtp.errors = {"user1@example.com": SMTPServerDisconnected("Connection lost")}
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+
+    results = await fm.send_bulk(make_messages(4))
+
+    assert [result.success for result in results] == [True, False, True, True]
+    assert "Connection lost" in results[1].error
+    assert len(fake_smtp.instances) == 2
+    assert [len(session.sent) for session in fake_smtp.instances] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_send_message_still_raises_on_failure(
+    mail_config, fake_smtp, make_messages
+):
+    fake_smtp.errors = {"user1@example.com": SMTPDataError(552, "Message too big")}
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+
+    with fm.record_messages() as outbox:
+        with pytest.raises(SMTPDataError):
+            await fm.send_message(make_messages(3))
+
+    assert outbox == []
+
+
+@pytest.mark.asyncio
+async def test_send_bulk_records_connection_failures(mail_config, make_messages):
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+
+    with patch.object(
+        Connection, "_configure_connection", side_effect=ConnectionErrors("down")
+    ):
+        results = await fm.send_bulk(make_messages(2))
+
+    assert [result.error for result in results] == ["down", "down"]
+
+
+@pytest.mark.asyncio
+async def test_pipelined_send_overlaps_preparing_and_sending(
+    mail_config, fake_smtp, make_messages
+):
+    conf = ConnectionConfig(**mail_config, SEND_PIPELINE_WINDOW=2)
+    fm = FastMail(conf)
+    sent_while_preparing = []
+    build = MailMsg._message
+
+    async def message(self, sender):
+        sent_while_preparing.append(len(fake_smtp.sent))
+        return await build(self, sender)
+
+    with patch.object(MailMsg, "_message", message):
+        with fm.record_messages() as outbox:
+            results = await fm.send_bulk(make_messages(6))
+
+    assert [result.accepted for result in results] == [
+        [f"user{i}@example.com"] for i in range(6)
+    ]
+    assert len(outbox) == 6
+    assert sent_while_preparing[0] == 0
+    assert sent_while_preparing[-1] > 0
+
+
+@pytest.mark.asyncio
+async def test_large_recipient_lists_are_sent_in_chunks(mail_config, fake_smtp):
+    fake_smtp.refused = {"r2@example.com", "r3@example.com", "hidden@example.com"}
+    conf = ConnectionConfig(**mail_config, MAX_RECIPIENTS_PER_ENVELOPE=2)
+    fm = FastMail(conf)
+    message = MessageSchema(
+        subject="Announcement",
+        recipients=[f"r{i}@example.com" for i in range(5)],
+        bcc=["hidden@example.com"],
+        body="announcement body",
+        subtype=MessageType.plain,
+    )
+
+    (result,) = await fm.send_bulk([message])
+
+    assert result.success
+    assert [recipients for _, recipients, _ in fake_smtp.sent] == [
+        ["r0@example.com", "r1@example.com"],
+        ["r4@example.com", "hidden@example.com"],
+    ]
+    assert len({data for _, _, data in fake_smtp.sent}) == 1
+    assert b"hidden@example.com" not in fake_smtp.sent[0][2]
+    assert result.accepted == ["r0@example.com", "r1@example.com", "r4@example.com"]
+    assert set(result.refused) == {
+        "r2@example.com",
+        "r3@example.com",
+        "hidden@example.com",
+    }
+
+
+@pytest.mark.asyncio
+async def test_retried_chunked_send_skips_delivered_envelopes(mail_config, fake_smtp):
+    fake_smtp.errors = {"r2@example.com": SMTPServerDisconnected("Connection lost")}
+    conf = ConnectionConfig(**mail_config, MAX_RECIPIENTS_PER_ENVELOPE=2)
+    fm = FastMail(conf, retry_policy=RetryPolicy(base_delay=0))
+    message = MessageSchema(
+        subject="Announcement",
+        recipients=[f"r{i}@example.com" for i in range(4)],
+        body="announcement body",
+        subtype=MessageType.plain,
+    )
+
+    (result,) = await fm.send_bulk([message])
+
+    assert result.success and result.attempts == 2
+    assert [recipients for _, recipients, _ in fake_smtp.sent] == [
+        ["r0@example.com", "r1@example.com"],
+        ["r2@example.com", "r3@example.com"],
+    ]
+    assert result.accepted == [f"r{i}@example.com" for i in range(4)]
+
+
+@pytest.mark.asyncio
+async def test_failed_chunked_send_keeps_delivered_recipients(mail_config, fake_smtp):
+    fake_smtp.refused = {"r1@example.com"}
+    fake_smtp.errors = {"r2@example.com": SMTPDataError(554, "Rejected")}
+    conf = ConnectionConfig(**mail_config, MAX_RECIPIENTS_PER_ENVELOPE=2)
+    fm = FastMail(conf)
+    message = MessageSchema(
+        subject="Announcement",
+        recipients=[f"r{i}@example.com" for i in range(4)],
+        body="announcement body",
+        subtype=MessageType.plain,
+    )
+
+    (result,) = await fm.send_bulk([message])
+
+    assert not result.success
+    assert result.code == 554
+    assert [recipients for _, recipients, _ in fake_smtp.sent] == [
+        ["r0@example.com", "r1@example.com"]
+    ]
+    assert result.accepted == ["r0@example.com"]
+    assert result.refused == {
+        "r1@example.com": (550, "User unknown"),
+        "r2@example.com": (554, "Rejected"),
+        "r3@example.com": (554, "Rejected"),
+    }
@@ -9,6 +9,7 @@ from fastapi_mail import (
     MessageSchema,
     MessageType,
     MultipartSubtypeEnum,
+    RenderMode,
 )
 from fastapi_mail.connection import Connection
 from fastapi_mail.errors import EmptyMessagesList, PydanticClassRequired
@@ -604,3 +605,73 @@ async def test_send_message_list_with_attachments(mail_config):
         assert len(outbox) == 2
         assert outbox[0]._payload[1].get_content_maintype() == "application"
         assert outbox[1]._payload[1].get_content_maintype() == "application"
+
+
+@pytest.mark.asyncio
+async def test_template_environment_is_reused(mail_config, tmp_path):
+    conf = ConnectionConfig(**mail_config, TEMPLATE_BYTECODE_CACHE_DIR=tmp_path)
+    fm = FastMail(conf)
+
+    for _ in range(2):
+        msg = MessageSchema(
+            subject="testing",
+            recipients=["to@example.com"],
+            template_body={"name": "Andrej"},
+            subtype=MessageType.html,
+        )
+        await fm.send_message(message=msg, template_name="simple_jinja_template.html")
+
+    env = conf.template_engine()
+    assert env is conf.template_engine()
+    assert len(env.cache) == 1
+    assert list(tmp_path.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_warm_templates_reports_failures(mail_config, tmp_path):
+    (tmp_path / "good.html").write_text("<p>{{ name }}</p>")
+    (tmp_path / "broken.html").write_text("{% if %}")
+    (tmp_path / "notes.txt").write_text("not a template")
+    conf = ConnectionConfig(**{**mail_config, "TEMPLATE_FOLDER": tmp_path})
+    fm = FastMail(conf)
+
+    warmup = await fm.warm_templates(extensions=["html"])
+    assert warmup.compiled == ["good.html"]
+    assert list(warmup.failed) == ["broken.html"]
+    assert not warmup.success
+    assert warmup.elapsed > 0
+    assert len(conf.template_engine().cache) == 1
+
+    warmup = await fm.warm_templates(["good.html", "missing.html"])
+    assert warmup.compiled == ["good.html"]
+    assert warmup.failed["missing.html"].startswith("TemplateNotFound")
+
+
+@pytest.mark.asyncio
+async def test_warm_templates_reports_binary_files(mail_config, tmp_path):
+    (tmp_path / "good.html").write_text("<p>{{ name }}</p>")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\xff\xd8\xff")
+    conf = ConnectionConfig(**{**mail_config, "TEMPLATE_FOLDER": tmp_path})
+    fm = FastMail(conf)
+
+    warmup = await fm.warm_templates()
+    assert warmup.compiled == ["good.html"]
+    assert warmup.failed["logo.png"].startswith("UnicodeDecodeError")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", list(RenderMode))
+async def test_render_modes(mail_config, mode):
+    conf = ConnectionConfig(**mail_config, TEMPLATE_RENDER_MODE=mode)
+    fm = FastMail(conf)
+    msg = MessageSchema(
+        subject="testing",
+        recipients=["to@example.com"],
+        template_body={"name": "Andrej"},
+        subtype=MessageType.html,
+    )
+
+    await fm.send_message(message=msg, template_name="simple_jinja_template.html")
+    await fm.aclose()
+
+    assert msg.template_body == "\n   Andrej\n"
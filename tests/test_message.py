@@ -1,8 +1,12 @@
 import os
+from io import BytesIO
+from unittest.mock import patch
 
 import pytest
+from pydantic import NameEmail
+from starlette.datastructures import UploadFile
 
-from fastapi_mail.msg import MailMsg
+from fastapi_mail.msg import MailBatch, MailMsg, make_message_id, serialize
 from fastapi_mail.schemas import MessageSchema, MessageType, MultipartSubtypeEnum
 
 
@@ -197,6 +201,30 @@ async def test_msgid_header():
     assert msg_object["Message-ID"] is not None
 
 
+def test_message_ids_are_unique_without_dns_lookups():
+    with patch("fastapi_mail.msg.socket.getfqdn", return_value="host.local") as fqdn:
+        ids = {make_message_id() for _ in range(1000)}
+
+    assert len(ids) == 1000
+    assert all(msgid.startswith("<") and msgid.endswith(">") for msgid in ids)
+    assert fqdn.call_count <= 1
+    assert make_message_id("mail.example.com").endswith("@mail.example.com>")
+
+
+@pytest.mark.asyncio
+async def test_msgid_domain_from_batch():
+    message = MessageSchema(
+        subject="test subject",
+        recipients=["test@gmail.com"],
+        body="test",
+        subtype=MessageType.plain,
+    )
+
+    msg = MailMsg(message, MailBatch(msgid_domain="mail.example.com"))
+    msg_object = await msg._message("test@example.com")
+    assert msg_object["Message-ID"].endswith("@mail.example.com>")
+
+
 @pytest.mark.asyncio
 async def test_message_charset():
     message = MessageSchema(
@@ -307,3 +335,91 @@ async def test_name_email_message_headers():
     assert msg_object["Cc"] == "CC User <cc@example.com>"
     assert msg_object["Bcc"] == "BCC User <bcc@example.com>"
     assert msg_object["Reply-To"] == "Reply User <reply@example.com>"
+
+
+@pytest.mark.asyncio
+async def test_batch_encodes_shared_attachment_once():
+    attachment = UploadFile(filename="terms.pdf", file=BytesIO(b"terms"))
+    batch = MailBatch()
+    parts = []
+    for recipient in ["a@example.com", "b@example.com"]:
+        schema = MessageSchema(
+            subject="testing",
+            recipients=[recipient],
+            body="test mail body",
+            subtype=MessageType.plain,
+            attachments=[attachment],
+        )
+        message = await MailMsg(schema, batch)._message("from@example.com")
+        parts.append(message.get_payload()[1])
+
+    assert parts[0] is parts[1]
+    assert parts[0].get_payload(decode=True) == b"terms"
+
+
+@pytest.mark.asyncio
+async def test_batch_shares_attachments_with_equal_content():
+    attachment = os.getcwd() + "/tests/txt_files/plain.txt"
+    batch = MailBatch()
+    schemas = [
+        MessageSchema(
+            subject="testing",
+            recipients=["to@example.com"],
+            body="test mail body",
+            subtype=MessageType.plain,
+            attachments=[attachment],
+        )
+        for _ in range(2)
+    ]
+
+    first, second = [
+        await MailMsg(schema, batch)._message("from@example.com") for schema in schemas
+    ]
+
+    assert first.get_payload()[1] is second.get_payload()[1]
+
+
+@pytest.mark.asyncio
+async def test_prevalidated_message_matches_validated():
+    fields = dict(
+        subject="testing",
+        recipients=["to@example.com", NameEmail("Jane", "jane@example.com")],
+        bcc=["hidden@example.com"],
+        body="test mail body",
+        subtype=MessageType.plain,
+        alternative_body="dropped",
+    )
+    validated = MessageSchema(**fields)
+    trusted = MessageSchema.prevalidated(**fields)
+
+    assert trusted.recipients == validated.recipients
+    assert trusted.bcc == validated.bcc
+    assert trusted.alternative_body is None
+    assert trusted.cc == [] and trusted.attachments == []
+    first = await MailMsg(validated)._message("from@example.com")
+    second = await MailMsg(trusted)._message("from@example.com")
+    assert first["To"] == second["To"] == "to <to@example.com>, Jane <jane@example.com>"
+    assert MailMsg(trusted)._envelope() == [
+        "to@example.com",
+        "jane@example.com",
+        "hidden@example.com",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_serialize_leaves_out_bcc():
+    schema = MessageSchema(
+        subject="test subject",
+        recipients=["to@example.com"],
+        body="test",
+        subtype=MessageType.plain,
+    )
+    message = await MailMsg(schema)._message("from@example.com")
+    message["Bcc"] = "hidden@example.com"
+    message["Resent-Bcc"] = "hidden@example.com"
+
+    data = serialize(message)
+
+    assert b"hidden@example.com" not in data
+    assert b"to@example.com" in data
+    assert message["Bcc"] == message["Resent-Bcc"] == "hidden@example.com"
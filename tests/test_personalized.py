@@ -0,0 +1,73 @@
+import pytest
+
+from fastapi_mail import (
+    ConnectionConfig,
+    FastMail,
+    MessageSchema,
+    MessageType,
+    Personalization,
+)
+
+
+def shared_message() -> MessageSchema:
+    return MessageSchema(
+        subject="Hello",
+        recipients=[],
+        subtype=MessageType.html,
+    )
+
+
+@pytest.mark.asyncio
+async def test_send_personalized_renders_each_recipient(mail_config, fake_smtp):
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+
+    async def recipients():
+        for name in ["Ann", "Bob", "Cid"]:
+            yield Personalization(
+                recipient=f"{name.lower()}@example.com",
+                template_body={"name": name},
+                subject=f"Hello {name}" if name == "Bob" else None,
+            )
+
+    with fm.record_messages() as outbox:
+        results = [
+            result
+            async for result in fm.send_personalized(
+                shared_message(),
+                recipients(),
+                template_name="simple_jinja_template.html",
+                window=1,
+            )
+        ]
+
+    assert [result.accepted for result in results] == [
+        ["ann@example.com"],
+        ["bob@example.com"],
+        ["cid@example.com"],
+    ]
+    assert [message["Subject"] for message in outbox] == ["Hello", "Hello Bob", "Hello"]
+    assert outbox[2].get_payload()[0].get_payload(decode=True) == b"\n   Cid\n"
+    assert len(fake_smtp.instances) == 1
+
+
+@pytest.mark.asyncio
+async def test_send_personalized_reads_recipients_lazily(mail_config, fake_smtp):
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+    pulled = []
+
+    def recipients():
+        for index in range(100):
+            pulled.append(index)
+            yield Personalization(recipient=f"user{index}@example.com")
+
+    message = shared_message()
+    message.body = "same for everyone"
+    stream = fm.send_personalized(message, recipients(), window=2)
+    first = await stream.__anext__()
+    await stream.aclose()
+
+    assert first.accepted == ["user0@example.com"]
+    assert len(pulled) < 10
+    assert len(fake_smtp.sent) < 10
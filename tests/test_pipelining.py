@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from aiosmtplib import SMTPRecipientsRefused, SMTPResponse
+
+from fastapi_mail import ConnectionConfig, MessageSchema, MessageType
+from fastapi_mail.connection import Connection
+from fastapi_mail.msg import MailMsg, serialize
+
+
+class PipeliningProtocol:
+    """Answers every command of a batch at once, split over odd chunk sizes"""
+
+    def __init__(self, refused=()) -> None:
+        self.refused = refused
+        self.writes: list = []
+
+    def data_received(self, data: bytes) -> None:
+        raise AssertionError("replies must not reach the aiosmtplib parser")
+
+    def connection_lost(self, exc) -> None:
+        pass
+
+    def write(self, data: bytes) -> None:
+        self.writes.append(data)
+        if data.startswith(b"MAIL"):
+            replies = [b"250 sender ok\r\n"]
+            for command in data.split(b"\r\n")[1:]:
+                if command.startswith(b"RCPT"):
+                    address = command[9:-1].decode()
+                    code = b"550" if address in self.refused else b"250"
+                    replies.append(code + b"-first line\r\n" + code + b" rcpt\r\n")
+            replies.append(b"354 go ahead\r\n")
+        else:
+            replies = [b"250 queued as 1\r\n"]
+        payload = b"".join(replies)
+        loop = asyncio.get_running_loop()
+        while payload:
+            loop.call_soon(self.data_received, payload[:7])
+            payload = payload[7:]
+
+
+class PipeliningSMTP:
+    is_connected = True
+    is_ehlo_or_helo_needed = False
+    esmtp_extensions = {"pipelining": "", "size": "0"}
+
+    def __init__(self, protocol: PipeliningProtocol) -> None:
+        self.protocol = protocol
+
+    def supports_extension(self, extension: str) -> bool:
+        return extension.lower() in ("pipelining", "size")
+
+    async def rset(self) -> SMTPResponse:
+        return SMTPResponse(250, "OK")
+
+
+async def build(recipients):
+    message = MessageSchema(
+        subject="pipelined",
+        recipients=recipients,
+        body=".starts with a dot",
+        subtype=MessageType.plain,
+    )
+    return serialize(await MailMsg(message)._message("sender@example.com"))
+
+
+@pytest.mark.asyncio
+async def test_pipelined_envelope_goes_out_in_one_write(mail_config):
+    connection = Connection(ConnectionConfig(**mail_config))
+    protocol = PipeliningProtocol(refused=("bad@example.com",))
+    connection.session = PipeliningSMTP(protocol)
+
+    recipients = ["a@example.com", "bad@example.com", "b@example.com"]
+    errors, response = await connection.sendmail(
+        "sender@example.com", recipients, await build(recipients)
+    )
+
+    assert response == "queued as 1"
+    assert list(errors) == ["bad@example.com"]
+    assert errors["bad@example.com"].code == 550
+    envelope, body = protocol.writes
+    assert envelope.count(b"RCPT TO:") == 3
+    assert envelope.startswith(b"MAIL FROM:<sender@example.com> size=")
+    assert envelope.endswith(b"DATA\r\n")
+    assert body.endswith(b"\r\n.\r\n")
+    assert "data_received" not in vars(protocol)
+
+
+@pytest.mark.asyncio
+async def test_pipelined_all_recipients_refused(mail_config):
+    connection = Connection(ConnectionConfig(**mail_config))
+    protocol = PipeliningProtocol(refused=("bad@example.com",))
+    connection.session = PipeliningSMTP(protocol)
+
+    with pytest.raises(SMTPRecipientsRefused):
+        await connection.sendmail(
+            "sender@example.com", ["bad@example.com"], await build(["bad@example.com"])
+        )
+
+    # The server accepted DATA, so the transaction is closed with an empty body
+    assert protocol.writes[-1] == b".\r\n"
@@ -0,0 +1,148 @@
+from unittest.mock import patch
+
+import pytest
+from aiosmtplib import SMTPDataError, SMTPServerDisconnected
+
+from fastapi_mail import ConnectionConfig, FastMail, RetryPolicy
+from fastapi_mail.connection import Connection, ConnectionPool
+from fastapi_mail.errors import ConnectionErrors
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_connection_between_sends(mail_config, make_message):
+    conf = ConnectionConfig(**mail_config, USE_CONNECTION_POOL=True)
+    fm = FastMail(conf)
+
+    with patch.object(
+        Connection,
+        "_configure_connection",
+        autospec=True,
+        side_effect=Connection._configure_connection,
+    ) as configure:
+        await fm.send_message(make_message())
+        await fm.send_message(make_message())
+
+    assert configure.call_count == 1
+    assert fm.pool.size == 1
+    assert fm.pool.idle == 1
+    await fm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_pool_recycles_connection_after_message_cap(mail_config, make_message):
+    conf = ConnectionConfig(
+        **mail_config, USE_CONNECTION_POOL=True, POOL_MAX_MESSAGES_PER_CONNECTION=2
+    )
+    fm = FastMail(conf)
+
+    with patch.object(
+        Connection,
+        "_configure_connection",
+        autospec=True,
+        side_effect=Connection._configure_connection,
+    ) as configure:
+        with fm.record_messages() as outbox:
+            await fm.send_message([make_message(subject=str(i)) for i in range(5)])
+
+    assert len(outbox) == 5
+    assert configure.call_count == 3
+    assert fm.pool.size == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_drops_idle_and_unhealthy_connections(mail_config):
+    conf = ConnectionConfig(
+        **mail_config, USE_CONNECTION_POOL=True, POOL_IDLE_TIMEOUT=0
+    )
+    pool = ConnectionPool(conf)
+
+    first = await pool.acquire()
+    await pool.release(first)
+    second = await pool.acquire()
+    assert second is not first
+    await pool.release(second)
+
+    conf.POOL_IDLE_TIMEOUT = 60
+    with patch.object(Connection, "is_healthy", return_value=False):
+        third = await pool.acquire()
+    assert third is not second
+    assert pool.size == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_keeps_min_size_and_rejects_after_close(mail_config):
+    conf = ConnectionConfig(**mail_config, USE_CONNECTION_POOL=True, POOL_MIN_SIZE=2)
+    pool = ConnectionPool(conf)
+    await pool.open()
+    assert pool.idle == 2
+
+    await pool.aclose()
+    assert pool.size == 0
+    with pytest.raises(ConnectionErrors):
+        await pool.acquire()
+
+
+def assert_all_released(fm, max_size):
+    relay = fm.relays.relays[0]
+    assert relay.outstanding == 0
+    assert fm.pool.size == fm.pool.idle
+    assert fm.pool._semaphore()._value == max_size
+
+
+@pytest.mark.asyncio
+async def test_failed_send_releases_dropped_session_once(
+    mail_config, fake_smtp, make_message
+):
+    fake_smtp.errors = {"drop@example.com": SMTPServerDisconnected("Connection lost")}
+    conf = ConnectionConfig(**mail_config, USE_CONNECTION_POOL=True, POOL_MAX_SIZE=2)
+    fm = FastMail(conf)
+    messages = [make_message(), make_message("drop@example.com")]
+
+    with pytest.raises(SMTPServerDisconnected):
+        await fm.send_message(messages)
+
+    assert_all_released(fm, 2)
+
+
+@pytest.mark.asyncio
+async def test_failed_retry_releases_its_new_session(
+    mail_config, fake_smtp, make_message
+):
+    fake_smtp.errors = {
+        "a@example.com": SMTPServerDisconnected("Connection lost"),
+        "b@example.com": SMTPDataError(554, "Rejected"),
+    }
+    conf = ConnectionConfig(**mail_config, USE_CONNECTION_POOL=True, POOL_MAX_SIZE=2)
+    fm = FastMail(conf, retry_policy=RetryPolicy(base_delay=0))
+    message = make_message(recipients=["a@example.com", "b@example.com"])
+
+    with pytest.raises(SMTPDataError):
+        await fm.send_message(message)
+
+    assert len(fake_smtp.instances) == 2
+    assert_all_released(fm, 2)
+
+
+@pytest.mark.asyncio
+async def test_pool_closes_expired_connections_at_the_old_end(mail_config):
+    conf = ConnectionConfig(
+        **mail_config, USE_CONNECTION_POOL=True, POOL_MIN_SIZE=1, POOL_IDLE_TIMEOUT=60
+    )
+    pool = ConnectionPool(conf)
+    oldest, older, recent = [await pool.acquire() for _ in range(3)]
+    for connection in (oldest, older, recent):
+        await pool.release(connection)
+    assert pool.idle == 3
+
+    # Only the most recently used connection is ever checked out again, the
+    # expired ones below it are closed all the same
+    oldest.last_used -= 120
+    older.last_used -= 120
+    await pool.release(await pool.acquire())
+    assert pool.idle == 1
+
+    # POOL_MIN_SIZE connections stay open however long they are idle
+    recent.last_used -= 120
+    assert await pool.acquire() is recent
+    await pool.release(recent)
+    assert pool.idle == 1
@@ -0,0 +1,67 @@
+from email import message_from_bytes
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from fastapi_mail import ConnectionConfig, FastMail, MessageType
+from fastapi_mail.msg import MailMsg
+
+
+@pytest.fixture
+def make_messages(make_message):
+    def make(count, attachment):
+        return [
+            make_message(
+                f"user{i}@example.com",
+                subject=f"Invoice {i}",
+                bcc=["archive@example.com"],
+                body="<p>Your invoice is attached</p>",
+                subtype=MessageType.html,
+                attachments=[attachment],
+            )
+            for i in range(count)
+        ]
+
+    return make
+
+
+@pytest.mark.asyncio
+async def test_prototype_builds_shared_body_once(mail_config, fake_smtp, make_messages):
+    conf = ConnectionConfig(**mail_config, USE_MIME_PROTOTYPES=True)
+    fm = FastMail(conf)
+    attachment = UploadFile(filename="invoice.pdf", file=BytesIO(b"%PDF-1.4 invoice"))
+
+    with patch.object(
+        MailMsg, "_body", autospec=True, side_effect=MailMsg._body
+    ) as body:
+        with fm.record_messages() as outbox:
+            await fm.send_message(make_messages(3, attachment))
+
+    assert body.call_count == 1
+    assert [mail["Subject"] for mail in outbox] == [f"Invoice {i}" for i in range(3)]
+    for i, (_, recipients, data) in enumerate(fake_smtp.sent):
+        assert recipients == [f"user{i}@example.com", "archive@example.com"]
+        assert b"archive@example.com" not in data
+        parsed = message_from_bytes(data)
+        assert parsed["To"] == f"user{i} <user{i}@example.com>"
+        assert parsed["Message-ID"] == outbox[i]["Message-ID"]
+        html, pdf = parsed.get_payload()
+        assert html.get_payload(decode=True) == b"<p>Your invoice is attached</p>"
+        assert pdf.get_payload(decode=True) == b"%PDF-1.4 invoice"
+
+
+@pytest.mark.asyncio
+async def test_prototype_matches_regular_serialization(mail_config, make_messages):
+    attachment = UploadFile(filename="invoice.pdf", file=BytesIO(b"%PDF-1.4 invoice"))
+    (schema,) = make_messages(1, attachment)
+    msg = MailMsg(schema)
+
+    prototype = await msg._prototype()
+    cloned = msg._from_prototype(prototype, "sender@example.com")
+    regular = prototype.message
+    msg._add_headers(regular, "sender@example.com")
+    del regular["Bcc"]
+
+    assert cloned.as_smtp_bytes() == regular.as_bytes(policy=prototype.policy)
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+from fastapi_mail.ratelimit import RateLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_makes_callers_wait():
+    bucket = TokenBucket(rate=50, capacity=2)
+
+    assert await bucket.acquire() < 0.005
+    assert await bucket.acquire() < 0.005
+    assert bucket.level < 0.1
+
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.015
+    assert bucket.throttled > 0
+    assert bucket.status()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_request_above_capacity_goes_into_debt():
+    bucket = TokenBucket(rate=100, capacity=5)
+
+    await bucket.acquire(8)
+
+    assert bucket.tokens < 0
+    assert bucket.level == 0
+
+
+def test_rate_limiter_from_config(mail_config):
+    limiter = RateLimiter.from_config(ConnectionConfig(**mail_config))
+    assert not limiter.enabled
+    assert limiter.status() == {"messages": None, "recipients": None}
+
+    conf = ConnectionConfig(
+        **mail_config,
+        RATE_LIMIT_MESSAGES_PER_SECOND=10,
+        RATE_LIMIT_RECIPIENTS_PER_MINUTE=600,
+        RATE_LIMIT_RECIPIENTS_BURST=50,
+    )
+    limiter = RateLimiter.from_config(conf)
+    assert limiter.messages.rate == 10
+    assert limiter.messages.capacity == 10
+    assert limiter.recipients.rate == 10
+    assert limiter.recipients.capacity == 50
+
+
+@pytest.mark.asyncio
+async def test_send_is_smoothed_by_rate_limit(mail_config):
+    conf = ConnectionConfig(
+        **mail_config,
+        RATE_LIMIT_MESSAGES_PER_SECOND=50,
+        RATE_LIMIT_MESSAGES_BURST=1,
+        RATE_LIMIT_RECIPIENTS_PER_MINUTE=6000,
+        RATE_LIMIT_RECIPIENTS_BURST=4,
+    )
+    fm = FastMail(conf)
+    messages = [
+        MessageSchema(
+            subject="limited",
+            recipients=["a@example.com", "b@example.com"],
+            body="limited",
+            subtype=MessageType.plain,
+        )
+        for _ in range(4)
+    ]
+
+    started = time.monotonic()
+    results = await fm.send_bulk(messages, concurrency=2)
+
+    assert all(result.success for result in results)
+    assert time.monotonic() - started >= 0.05
+    status = fm.rate_limiter.status()
+    assert status["messages"]["throttled"] > 0
+    assert status["recipients"]["throttled"] > 0
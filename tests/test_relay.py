@@ -0,0 +1,162 @@
+import asyncio
+from email import message_from_bytes
+
+import pytest
+
+from fastapi_mail import ConnectionConfig, FastMail
+from fastapi_mail.errors import ConnectionErrors, MessageTooLarge
+from fastapi_mail.relay import BalanceStrategy, Relay, RelayGroup
+
+
+def relay_config(mail_config: dict, hostname: str) -> ConnectionConfig:
+    return ConnectionConfig(**{**mail_config, "MAIL_SERVER": hostname})
+
+
+@pytest.mark.asyncio
+async def test_weighted_round_robin_spreads_sessions(
+    mail_config, fake_smtp, make_message
+):
+    conf = ConnectionConfig(**mail_config)
+    relays = [
+        Relay(relay_config(mail_config, "a.example.com"), weight=2),
+        Relay(relay_config(mail_config, "b.example.com")),
+    ]
+    fm = FastMail(conf, relays=relays)
+
+    for _ in range(6):
+        await fm.send_message(make_message())
+
+    assert len(fake_smtp.sent_through("a.example.com")) == 4
+    assert len(fake_smtp.sent_through("b.example.com")) == 2
+    assert fake_smtp.sent_through("localhost") == []
+    await fm.aclose()
+
+
+def test_least_outstanding_prefers_idle_relay(mail_config):
+    first = Relay(relay_config(mail_config, "a.example.com"), weight=2)
+    second = Relay(relay_config(mail_config, "b.example.com"))
+    group = RelayGroup([first, second], strategy=BalanceStrategy.least_outstanding)
+
+    first.outstanding = 3
+    second.outstanding = 1
+    assert group.candidates() == [second, first]
+    second.outstanding = 2
+    assert group.candidates() == [first, second]
+
+
+@pytest.mark.asyncio
+async def test_failing_relay_leaves_rotation_and_recovers(
+    mail_config, fake_smtp, make_message
+):
+    fake_smtp.down.add("a.example.com")
+    group = RelayGroup(
+        [
+            relay_config(mail_config, "a.example.com"),
+            relay_config(mail_config, "b.example.com"),
+        ],
+        max_failures=2,
+        probe_interval=0.01,
+    )
+    fm = FastMail(ConnectionConfig(**mail_config), relays=group)
+    first, _ = group.relays
+
+    for _ in range(4):
+        await fm.send_message(make_message())
+
+    assert len(fake_smtp.sent_through("b.example.com")) == 4
+    assert not first.healthy
+    assert group.status()[0]["failures"] == 2
+
+    fake_smtp.down.clear()
+    await asyncio.sleep(0.05)
+    assert first.healthy
+    assert first.failures == 0
+
+    await fm.send_message(make_message())
+    await fm.send_message(make_message())
+    assert len(fake_smtp.sent_through("a.example.com")) == 1
+    await fm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_oversized_message_goes_to_relay_that_takes_it(
+    mail_config, fake_smtp, make_message
+):
+    fake_smtp.size_limits.update({"a.example.com": 100, "b.example.com": 10000})
+    group = RelayGroup(
+        [
+            relay_config(mail_config, "a.example.com"),
+            relay_config(mail_config, "b.example.com"),
+        ]
+    )
+    fm = FastMail(ConnectionConfig(**mail_config), relays=group)
+
+    (result,) = await fm.send_bulk([make_message()])
+
+    assert result.success
+    assert result.attempts == 1
+    assert fake_smtp.sent_through("a.example.com") == []
+    ((_, _, data),) = fake_smtp.sent_through("b.example.com")
+    assert 100 < result.size == len(data) < 10000
+    assert message_from_bytes(data)["Subject"] == "test"
+    assert group.relays[0].failures == 0
+
+
+@pytest.mark.asyncio
+async def test_message_too_large_for_every_relay(mail_config, fake_smtp, make_message):
+    fake_smtp.size_limits.update({"a.example.com": 100, "b.example.com": 200})
+    group = RelayGroup(
+        [
+            relay_config(mail_config, "a.example.com"),
+            relay_config(mail_config, "b.example.com"),
+        ]
+    )
+    fm = FastMail(ConnectionConfig(**mail_config), relays=group)
+
+    (result,) = await fm.send_bulk([make_message()])
+
+    assert not result.success
+    assert result.code == 552
+    assert result.size > 200
+    assert fake_smtp.sent == []
+    with pytest.raises(MessageTooLarge) as error:
+        await fm.send_message(make_message())
+    assert error.value.limit in (100, 200)
+
+
+@pytest.mark.asyncio
+async def test_each_relay_keeps_its_own_quota(mail_config, fake_smtp, make_message):
+    limited = ConnectionConfig(
+        **{
+            **mail_config,
+            "MAIL_SERVER": "a.example.com",
+            "RATE_LIMIT_MESSAGES_PER_SECOND": 20,
+            "RATE_LIMIT_MESSAGES_BURST": 1,
+        }
+    )
+    group = RelayGroup([limited, relay_config(mail_config, "b.example.com")])
+    fm = FastMail(ConnectionConfig(**mail_config), relays=group)
+
+    for _ in range(4):
+        await fm.send_message(make_message())
+
+    assert len(fake_smtp.sent_through("a.example.com")) == 2
+    first, second = group.status()
+    assert first["rate_limit"]["messages"]["throttled"] > 0
+    assert second["rate_limit"] is None
+    assert fm.rate_limiter is group.relays[0].rate_limiter
+
+
+@pytest.mark.asyncio
+async def test_single_relay_is_not_probed(mail_config, fake_smtp, make_message):
+    fake_smtp.down.add("localhost")
+    fm = FastMail(ConnectionConfig(**mail_config))
+    (relay,) = fm.relays.relays
+
+    for _ in range(4):
+        with pytest.raises(ConnectionErrors):
+            await fm.send_message(make_message())
+
+    assert relay.failures == 4
+    assert relay.healthy
+    assert not fm.relays._probes
@@ -0,0 +1,133 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from aiosmtplib import (
+    SMTPAuthenticationError,
+    SMTPConnectResponseError,
+    SMTPConnectTimeoutError,
+    SMTPDataError,
+    SMTPReadTimeoutError,
+    SMTPRecipientRefused,
+    SMTPRecipientsRefused,
+    SMTPServerDisconnected,
+)
+
+from fastapi_mail import ConnectionConfig, FastMail, RetryPolicy
+from fastapi_mail.errors import ConnectionErrors
+from fastapi_mail.msg import serialize
+
+
+def connection_error(cause: Exception) -> ConnectionErrors:
+    error = ConnectionErrors(str(cause))
+    error.__cause__ = cause
+    return error
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (SMTPDataError(451, "Try again later"), True),
+        (SMTPDataError(554, "Rejected"), False),
+        (SMTPServerDisconnected("Connection lost"), True),
+        (SMTPReadTimeoutError("Timed out waiting for server response"), True),
+        (connection_error(SMTPConnectTimeoutError("Timed out connecting")), True),
+        (asyncio.TimeoutError(), True),
+        (
+            SMTPRecipientsRefused([SMTPRecipientRefused(450, "Greylisted", "a@b.c")]),
+            True,
+        ),
+        (SMTPRecipientsRefused([SMTPRecipientRefused(550, "Unknown", "a@b.c")]), False),
+        (connection_error(SMTPConnectResponseError(421, "Too many connections")), True),
+        (connection_error(SMTPAuthenticationError(535, "Bad credentials")), False),
+        (ConnectionErrors("Connection pool is closed"), False),
+        (ValueError("No recipient headers provided in message"), False),
+    ],
+)
+def test_retry_policy_classifies_errors(error, transient):
+    assert RetryPolicy.is_transient(error) is transient
+
+
+def test_retry_policy_backoff_and_deadline():
+    policy = RetryPolicy(base_delay=1, max_delay=5, jitter=False, max_attempts=10)
+    assert [policy.backoff(attempt) for attempt in range(1, 5)] == [1, 2, 4, 5]
+
+    transient = SMTPDataError(451, "Try again later")
+    assert policy.next_delay(transient, 1, elapsed=0) == 1
+    assert RetryPolicy(max_attempts=2).next_delay(transient, 2, elapsed=0) is None
+    policy.deadline = 3
+    assert policy.next_delay(transient, 2, elapsed=0.5) == 2
+    assert policy.next_delay(transient, 2, elapsed=1.5) is None
+
+    jittered = RetryPolicy(base_delay=4)
+    assert all(0 <= jittered.backoff(1) <= 4 for _ in range(20))
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried(mail_config, fake_smtp, make_message):
+    fake_smtp.errors = {
+        "greylisted@example.com": SMTPDataError(451, "Try again later"),
+        "dropped@example.com": SMTPServerDisconnected("Connection lost"),
+    }
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf, retry_policy=RetryPolicy(base_delay=0))
+
+    results = await fm.send_bulk(
+        [
+            make_message("greylisted@example.com"),
+            make_message("dropped@example.com"),
+        ]
+    )
+
+    assert [result.success for result in results] == [True, True]
+    assert [result.attempts for result in results] == [2, 2]
+    assert len(fake_smtp.instances) == 2
+
+
+@pytest.mark.asyncio
+async def test_permanent_errors_fail_immediately(mail_config, fake_smtp, make_message):
+    fake_smtp.errors = {"rejected@example.com": SMTPDataError(554, "Rejected")}
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf, retry_policy=RetryPolicy(base_delay=0))
+
+    (result,) = await fm.send_bulk([make_message("rejected@example.com")])
+
+    assert not result.success
+    assert result.attempts == 1
+    assert result.code == 554
+
+
+@pytest.mark.asyncio
+async def test_send_message_retries_before_raising(
+    mail_config, fake_smtp, make_message
+):
+    fake_smtp.errors = {"greylisted@example.com": SMTPDataError(451, "Later")}
+    conf = ConnectionConfig(**mail_config)
+
+    await FastMail(conf, retry_policy=RetryPolicy(base_delay=0)).send_message(
+        make_message("greylisted@example.com")
+    )
+    assert len(fake_smtp.sent) == 1
+
+    fake_smtp.errors = {"greylisted@example.com": SMTPDataError(451, "Later")}
+    with pytest.raises(SMTPDataError):
+        await FastMail(conf).send_message(make_message("greylisted@example.com"))
+
+
+@pytest.mark.asyncio
+async def test_retries_resend_the_same_bytes(mail_config, fake_smtp, make_message):
+    fake_smtp.errors = {"greylisted@example.com": SMTPDataError(451, "Later")}
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf, retry_policy=RetryPolicy(base_delay=0))
+    message = make_message("greylisted@example.com", bcc=["archive@example.com"])
+
+    with patch("fastapi_mail.msg.serialize", side_effect=serialize) as serialized:
+        (result,) = await fm.send_bulk([message])
+
+    assert result.attempts == 2
+    assert serialized.call_count == 1
+    ((sender, recipients, data),) = fake_smtp.sent
+    assert sender == "example@test.com"
+    assert recipients == ["greylisted@example.com", "archive@example.com"]
+    assert b"archive@example.com" not in data
+    assert b"\r\n" in data and b"\r\n\n" not in data
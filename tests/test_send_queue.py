@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from fastapi_mail import ConnectionConfig, FastMail
+from fastapi_mail.errors import (
+    PydanticClassRequired,
+    SendQueueClosed,
+    SendQueueFull,
+)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_returns_before_sending(mail_config, make_message):
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+
+    with fm.record_messages() as outbox:
+        future = await fm.enqueue(make_message())
+        assert not future.done()
+        assert outbox == []
+
+        await fm.drain()
+        assert len(outbox) == 1
+
+    (result,) = await future
+    assert result.success
+    assert fm.queue.stats["sent"] == 1
+    await fm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_rejects_when_full(mail_config, fake_smtp, make_message):
+    fake_smtp.delays = [0.01]
+    conf = ConnectionConfig(**mail_config, QUEUE_MAX_SIZE=1, QUEUE_WORKERS=1)
+    fm = FastMail(conf)
+
+    await fm.enqueue(make_message(subject="first"), wait=False)
+    with pytest.raises(SendQueueFull):
+        await fm.enqueue(make_message(subject="second"), wait=False)
+
+    # With backpressure the caller waits for room instead
+    await fm.enqueue(make_message(subject="second"))
+    await fm.enqueue(make_message(subject="third"))
+    await fm.aclose()
+    assert fm.queue.stats["sent"] == 3
+
+
+@pytest.mark.asyncio
+async def test_aclose_drains_and_stops_accepting(mail_config, fake_smtp, make_message):
+    conf = ConnectionConfig(**mail_config, QUEUE_WORKERS=2)
+    fm = FastMail(conf)
+
+    futures = [await fm.enqueue(make_message(subject=str(i))) for i in range(5)]
+    await fm.aclose()
+
+    assert all(future.done() for future in futures)
+    assert len(fake_smtp.sent) == 5
+    assert fm.queue.stats == {
+        "queued": 0,
+        "in_flight": 0,
+        "sent": 5,
+        "failed": 0,
+        "workers": 0,
+    }
+    with pytest.raises(SendQueueClosed):
+        await fm.enqueue(make_message())
+
+
+@pytest.mark.asyncio
+async def test_enqueue_reports_failures(mail_config, make_message):
+    conf = ConnectionConfig(**mail_config)
+    fm = FastMail(conf)
+
+    with pytest.raises(PydanticClassRequired):
+        await fm.enqueue("not-a-message")  # type: ignore[arg-type]
+
+    future = await fm.enqueue(make_message(), template_name="missing.html")
+    (result,) = await asyncio.wait_for(future, 1)
+
+    assert not result.success
+    assert "missing.html" in result.error
+    assert fm.queue.stats["failed"] == 1
+    await fm.aclose()
@@ -0,0 +1,152 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from aiosmtplib import SMTPDataError
+
+from fastapi_mail import (
+    ConnectionConfig,
+    FastMail,
+    Personalization,
+)
+from fastapi_mail.spool import Spool, SpoolStatus
+
+
+@pytest.mark.asyncio
+async def test_spool_group_commits_concurrent_writes(tmp_path):
+    spool = Spool(tmp_path / "outbox.db")
+    ids = await spool.add(
+        [
+            (f"<{i}@example.com>", "from@example.com", ["to@example.com"], b"data")
+            for i in range(3)
+        ]
+    )
+
+    with patch.object(
+        Spool, "_apply", autospec=True, side_effect=Spool._apply
+    ) as apply:
+        await asyncio.gather(
+            spool.mark(ids[0], SpoolStatus.sent),
+            spool.mark(ids[1], SpoolStatus.failed, error="rejected"),
+        )
+    assert apply.call_count == 1
+
+    (pending,) = await spool.entries()
+    assert pending.id == ids[2]
+    assert pending.recipients == ["to@example.com"]
+    assert pending.data == b"data"
+    (failed,) = await spool.entries(SpoolStatus.failed)
+    assert failed.error == "rejected"
+    assert failed.attempts == 1
+
+    assert await spool.purge() == 1
+    assert await spool.entries(SpoolStatus.sent) == []
+    await spool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sent_messages_are_marked_in_spool(mail_config, tmp_path, make_message):
+    conf = ConnectionConfig(**mail_config, SPOOL_PATH=tmp_path / "outbox.db")
+    fm = FastMail(conf)
+
+    await fm.send_message(
+        [make_message("a@example.com"), make_message("b@example.com")]
+    )
+
+    sent = await fm.spool.entries(SpoolStatus.sent)
+    assert [entry.recipients for entry in sent] == [
+        ["a@example.com"],
+        ["b@example.com"],
+    ]
+    assert b"Subject: test" in sent[0].data
+    assert await fm.spool.entries() == []
+    await fm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_leaves_nothing_pending(
+    mail_config, fake_smtp, tmp_path, make_message
+):
+    fake_smtp.errors = {"a@example.com": SMTPDataError(554, "Rejected")}
+    conf = ConnectionConfig(**mail_config, SPOOL_PATH=tmp_path / "outbox.db")
+    fm = FastMail(conf)
+
+    with pytest.raises(SMTPDataError):
+        await fm.send_message(
+            [make_message("a@example.com"), make_message("b@example.com")]
+        )
+
+    assert len(await fm.spool.entries(SpoolStatus.failed)) == 2
+    assert await fm.spool.entries() == []
+    await fm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_pending_entries_are_replayed_on_startup(
+    mail_config, fake_smtp, tmp_path, make_message
+):
+    path = tmp_path / "outbox.db"
+    conf = ConnectionConfig(**mail_config, SPOOL_PATH=path)
+    crashed = FastMail(conf)
+    # Simulate a process that died after spooling but before sending
+    with patch.object(
+        FastMail, "_FastMail__open_session", side_effect=asyncio.CancelledError
+    ):
+        with pytest.raises(asyncio.CancelledError):
+            await crashed.send_message(
+                make_message("a@example.com", bcc=["hidden@example.com"])
+            )
+    await crashed.spool.aclose()
+    assert fake_smtp.sent == []
+
+    fm = FastMail(conf)
+    with fm.record_messages() as outbox:
+        (result,) = await fm.replay_spool()
+
+    assert result.success
+    assert result.accepted == ["a@example.com", "hidden@example.com"]
+    ((sender, recipients, data),) = fake_smtp.sent
+    assert sender == "example@test.com"
+    assert recipients == ["a@example.com", "hidden@example.com"]
+    assert b"hidden@example.com" not in data
+    assert outbox[0]["Subject"] == "test"
+    assert await fm.replay_spool() == []
+    await fm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_spools_before_returning(mail_config, tmp_path, make_message):
+    conf = ConnectionConfig(**mail_config, SPOOL_PATH=tmp_path / "outbox.db")
+    fm = FastMail(conf)
+
+    future = await fm.enqueue(make_message("a@example.com"))
+    (pending,) = await fm.spool.entries()
+    assert pending.recipients == ["a@example.com"]
+
+    (result,) = await future
+    assert result.success
+    assert await fm.spool.entries() == []
+    await fm.aclose()
+
+
+@pytest.mark.asyncio
+async def test_personalized_messages_are_spooled(mail_config, tmp_path, make_message):
+    conf = ConnectionConfig(**mail_config, SPOOL_PATH=tmp_path / "outbox.db")
+    fm = FastMail(conf)
+    recipients = [Personalization(recipient=f"{name}@example.com") for name in "abc"]
+
+    results = [
+        result
+        async for result in fm.send_personalized(
+            make_message("ignored@example.com"), recipients, window=1
+        )
+    ]
+
+    assert all(result.success for result in results)
+    sent = await fm.spool.entries(SpoolStatus.sent)
+    assert [entry.recipients for entry in sent] == [
+        ["a@example.com"],
+        ["b@example.com"],
+        ["c@example.com"],
+    ]
+    await fm.aclose()